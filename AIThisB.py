@@ -1,12 +1,6 @@
-import os
-import random
-from collections import deque
+import threading
 from math import radians
-from uuid import uuid4
 
-import numpy as np
-import tensorflow as tf
-import keras
 import pyglet
 from pyglet.gl import *
 from pyglet.graphics import Batch
@@ -15,13 +9,11 @@ from pyglet.math import Mat4, Vec3
 
 from cube import Cube
 from cubePieces import Piece
-from Constants import NUM_CUBES, SAVE_ITERATION, RESET_ITERATION, FPS
+from dqnAgent import NUM_ACTIONS, DQNAgent
+from checkpointing import CHECKPOINT_DIR
+from trainer import Trainer
+from Constants import NUM_CUBES, FPS, MOVES
 
-os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"
-
-MOVES = ["U", "Ud", "R", "Rd", "F", "Fd", "D", "Dd", "L", "Ld", "B", "Bd"]
-NUM_ACTIONS = len(MOVES)
-UNDO_PAIRS = {0: 1, 1: 0, 2: 3, 3: 2, 4: 5, 5: 4, 6: 7, 7: 6, 8: 9, 9: 8, 10: 11, 11: 10}
 SOLVED_STATE = Cube().get_state()
 
 COLOR_MAP = {
@@ -59,7 +51,15 @@ FRAGMENT_SOURCE = """#version 460
     }
 """
 
-SHADER_PROGRAM = ShaderProgram(Shader(VERTEX_SOURCE, 'vertex'), Shader(FRAGMENT_SOURCE, 'fragment'))
+_shader_program = None
+
+
+def shader_program() -> ShaderProgram:
+    # compiled on first draw, so importing this module does not need a GL context
+    global _shader_program
+    if _shader_program is None:
+        _shader_program = ShaderProgram(Shader(VERTEX_SOURCE, 'vertex'), Shader(FRAGMENT_SOURCE, 'fragment'))
+    return _shader_program
 
 
 class CubeWindow(pyglet.window.Window):
@@ -112,7 +112,7 @@ class CubeWindow(pyglet.window.Window):
             for index in f:
                 vertex = [x + y for x, y in zip(vertices[index], offset)]
                 positions.extend(vertex)
-            SHADER_PROGRAM.vertex_list_indexed(
+            shader_program().vertex_list_indexed(
                 4, pyglet.gl.GL_TRIANGLES, [0, 1, 2, 0, 2, 3],
                 position=('f', tuple(positions)),
                 colors=('f', face_colors[i] * 4),
@@ -120,122 +120,6 @@ class CubeWindow(pyglet.window.Window):
             )
 
 
-def apply_move(cube, action, last_action, rewarded_indices, step_count, max_steps):
-    getattr(cube, MOVES[action])()
-
-    reward = -0.1
-    if last_action is not None and UNDO_PAIRS[action] == last_action:
-        reward -= 1.0
-
-    state = cube.get_state()
-    for i, (s, sol) in enumerate(zip(state, SOLVED_STATE)):
-        if s == sol and i not in rewarded_indices:
-            reward += 0.5
-            rewarded_indices.add(i)
-
-    done = state == SOLVED_STATE or step_count + 1 >= max_steps
-    if state == SOLVED_STATE:
-        reward += 100.0
-        print("=" * 25 + "Cube solved!" + "=" * 25)
-
-    return np.array(state, dtype=np.float32), reward, done
-
-
-class DQNAgent:
-    def __init__(
-        self,
-        state_size: int,
-        num_actions: int = NUM_ACTIONS,
-        gamma: float = 0.95,
-        learning_rate: float = 1e-3,
-        buffer_size: int = 100_000,
-        model_path: str = "models/checkpoint.keras",
-    ):
-        self.id = uuid4()
-        self.state_size = state_size
-        self.num_actions = num_actions
-        self.gamma = gamma
-        self.learning_rate = learning_rate
-        self.replay_buffer = deque(maxlen=buffer_size)
-        self.model_path = model_path
-        os.makedirs("models", exist_ok=True)
-        self.save_path = f"models/{self.id}.keras"
-
-        self.model = self._build_model()
-        self.target_model = self._build_model()
-        self.load()
-        self.update_target()
-        self.model.summary()
-
-    def _build_model(self) -> keras.Sequential:
-        model = keras.Sequential([
-            keras.layers.Input(shape=(self.state_size,), dtype="float32"),
-        ])
-        for _ in range(4):
-            model.add(keras.layers.Dense(128))
-            model.add(keras.layers.LeakyReLU(alpha=0.01))
-            model.add(keras.layers.BatchNormalization())
-            model.add(keras.layers.Dropout(0.2))
-        model.add(keras.layers.Dense(self.num_actions))
-        model.compile(optimizer=keras.optimizers.Adam(self.learning_rate), loss="mse")
-        return model
-
-    def update_target(self):
-        self.target_model.set_weights(self.model.get_weights())
-
-    def remember(self, state, action, reward, next_state, done):
-        self.replay_buffer.append((state, action, reward, next_state, done))
-
-    def act_batch(self, states: np.ndarray, epsilon: float) -> np.ndarray:
-        q_values = self.model(states, training=False).numpy()
-        greedy_actions = np.argmax(q_values, axis=1)
-        random_actions = np.random.randint(0, self.num_actions, size=len(states))
-        explore_mask = np.random.rand(len(states)) < epsilon
-        return np.where(explore_mask, random_actions, greedy_actions)
-
-    def replay(self, batch_size: int = 64):
-        if len(self.replay_buffer) < batch_size:
-            return None
-
-        minibatch = random.sample(self.replay_buffer, batch_size)
-        states = np.array([t[0] for t in minibatch], dtype=np.float32)
-        actions = np.array([t[1] for t in minibatch], dtype=np.int32)
-        rewards = np.array([t[2] for t in minibatch], dtype=np.float32)
-        next_states = np.array([t[3] for t in minibatch], dtype=np.float32)
-        dones = np.array([t[4] for t in minibatch], dtype=np.float32)
-
-        return self._train_step(states, actions, rewards, next_states, dones)
-
-    @tf.function
-    def _train_step(self, states, actions, rewards, next_states, dones):
-        next_q = self.target_model(next_states, training=False)
-        max_next_q = tf.reduce_max(next_q, axis=1)
-        targets = rewards + (1.0 - dones) * self.gamma * max_next_q
-
-        action_masks = tf.one_hot(actions, self.num_actions)
-        with tf.GradientTape() as tape:
-            q_values = self.model(states, training=True)
-            selected_q = tf.reduce_sum(q_values * action_masks, axis=1)
-            loss = tf.reduce_mean(tf.square(targets - selected_q))
-
-        grads = tape.gradient(loss, self.model.trainable_variables)
-        self.model.optimizer.apply_gradients(zip(grads, self.model.trainable_variables))
-        return loss
-
-    def reset_gamma(self):
-        self.gamma = 0
-
-    def save(self):
-        self.model.save(self.model_path)
-
-    def load(self, input_path=None):
-        path = input_path if input_path else self.model_path
-        if os.path.exists(path):
-            self.model = keras.models.load_model(path)
-        else:
-            print("No model to load")
-
-
 def train(
     num_cubes: int = NUM_CUBES,
     num_iterations: int = 100_000,
@@ -247,76 +131,44 @@ def train(
     epsilon_end: float = 0.05,
     epsilon_decay: float = 0.999,
     render_indices=None,
+    prioritized: bool = False,
+    resume: bool = False,
+    checkpoint_dir: str = CHECKPOINT_DIR,
 ):
-    cubes = [Cube() for _ in range(num_cubes)]
-    for cube in cubes:
-        cube.scramble()
+    trainer = Trainer(
+        num_cubes, max_steps, batch_size, train_steps_per_iteration, target_update_every,
+        epsilon_start, epsilon_end, epsilon_decay, prioritized,
+        checkpoint_dir=checkpoint_dir, resume=resume,
+    )
+    # num_iterations counts this call's iterations, also when it picks up a checkpoint
+    last_iteration = trainer.iteration + num_iterations
 
     render_indices = set(render_indices or [])
-    windows = [CubeWindow(cubes[i], i) for i in range(num_cubes) if i in render_indices]
-
-    last_actions = [None] * num_cubes
-    rewarded_indices = [set() for _ in range(num_cubes)]
-    step_counts = [0] * num_cubes
-    episode_rewards = np.zeros(num_cubes, dtype=np.float32)
+    windows = {i: CubeWindow(Cube(), i) for i in range(num_cubes) if i in render_indices}
+    if not windows:
+        trainer.run(last_iteration)
+        return trainer
 
-    states = np.array([cube.get_state() for cube in cubes], dtype=np.float32)
-    agent = DQNAgent(state_size=states.shape[1])
+    # the learner runs flat out on its own thread; the windows only sample its states at display rate
+    learner = threading.Thread(target=trainer.run, args=(last_iteration,), daemon=True)
 
-    epsilon = epsilon_start
-    iteration = 0
-
-    def step(dt):
-        nonlocal epsilon, iteration
-        if iteration >= num_iterations:
+    def observe(dt):
+        if not learner.is_alive():
             pyglet.app.exit()
             return
-
-        actions = agent.act_batch(states, epsilon)
-        next_states = np.zeros_like(states)
-
-        for i, cube in enumerate(cubes):
-            next_state, reward, done = apply_move(
-                cube, int(actions[i]), last_actions[i], rewarded_indices[i],
-                step_counts[i], max_steps,
-            )
-            step_counts[i] += 1
-            last_actions[i] = int(actions[i])
-            episode_rewards[i] += reward
-
-            if done:
-                print(f"[cube {i}] episode reward={episode_rewards[i]:.2f} epsilon={epsilon:.3f}")
-                cube.make_solved_cube()
-                cube.scramble()
-                next_state = np.array(cube.get_state(), dtype=np.float32)
-                last_actions[i] = None
-                rewarded_indices[i] = set()
-                step_counts[i] = 0
-                episode_rewards[i] = 0.0
-
-            next_states[i] = next_state
-            agent.remember(states[i], actions[i], reward, next_state, done)
-
-        states[:] = next_states
-        epsilon = max(epsilon_end, epsilon * epsilon_decay)
-
-        for _ in range(train_steps_per_iteration):
-            agent.replay(batch_size)
-
-        if iteration % target_update_every == 0:
-            agent.update_target()
-
-        if iteration % SAVE_ITERATION == 0:
-            agent.save()
-            print(f"Iteration {iteration} complete (epsilon={epsilon:.3f})")
-        
-        if iteration % RESET_ITERATION == 0:
-            agent.reset_gamma()
-        
-        iteration += 1
-
-    pyglet.clock.schedule_interval(step, 1 / FPS)
-    pyglet.app.run()
+        states = trainer.states
+        for i, window in windows.items():
+            window.cube.set_state(states[i])
+
+    observe(0)
+    learner.start()
+    pyglet.clock.schedule_interval(observe, 1 / FPS)
+    try:
+        pyglet.app.run()
+    finally:
+        trainer.stop()
+        learner.join()
+    return trainer
 
 
 if __name__ == "__main__":
@@ -3,3 +3,4 @@ NUM_CUBES = 24
 SAVE_ITERATION = 100
 RESET_ITERATION = 10000
 FPS = 60
+MOVES = ["U", "Ud", "R", "Rd", "F", "Fd", "D", "Dd", "L", "Ld", "B", "Bd"]
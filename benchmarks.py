@@ -0,0 +1,286 @@
+import argparse
+import atexit
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+
+import numpy as np
+
+from cube import Cube
+from cubeEnv import CubeEnv
+from cubeLayout import NUM_STICKERS
+from cubePieces import Piece
+from fastCube import FastCube
+from Constants import MOVES
+
+BASELINE_PATH = "benchmark_baseline.json"
+# many short samples and their median: the fastest sample on a shared host is a burst, not the code
+MIN_TIME = 0.05
+REPEATS = 25
+# a report is only comparable with a baseline taken under the same settings
+SETTINGS = ("min_time", "repeats", "cpus")
+BENCHMARKS: dict[str, tuple[Callable[[], Callable[[], object]], int]] = {}
+
+
+def benchmark(name: str, ops_per_call: int = 1):
+    # a benchmark is a setup function returning the callable to time; ops_per_call scales calls to ops
+    def register(setup):
+        BENCHMARKS[name] = (setup, ops_per_call)
+        return setup
+    return register
+
+
+def calibrate(function, min_time: float = MIN_TIME) -> int:
+    # how many calls take about min_time
+    function()
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / 4:
+            break
+        calls *= 4
+    return max(1, int(calls * min_time / max(elapsed, 1e-9)))
+
+
+def time_calls(function, calls: int) -> float:
+    # collector pauses land on whichever benchmark happens to be running, so keep them out of the timings
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        return (time.perf_counter() - start) / calls
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _reference() -> int:
+    # fixed pure-Python work timed next to every sample; when the host slows down for a while it
+    # slows both, so their ratio is what gets compared with the baseline
+    total = 0
+    for i in range(200_000):
+        total += i * i
+    return total
+
+
+for _move in MOVES:
+    @benchmark(f"cube.move.{_move}")
+    def _cube_move(move=_move):
+        return getattr(Cube(), move)
+
+
+@benchmark("cube.get_state")
+def _cube_get_state():
+    cube = Cube()
+    cube.scramble(seed=0)
+    return cube.get_state
+
+
+@benchmark("cube.is_solved")
+def _cube_is_solved():
+    cube = Cube()
+    cube.scramble(seed=0)
+    return cube.is_solved
+
+
+@benchmark("cube.make_solved_cube")
+def _cube_make_solved():
+    cube = Cube()
+    return cube.make_solved_cube
+
+
+@benchmark("cube.scramble_25")
+def _cube_scramble():
+    cube = Cube()
+    return lambda: cube.scramble(25)
+
+
+@benchmark("fast_cube.move", ops_per_call=len(MOVES))
+def _fast_cube_moves():
+    cube = FastCube()
+    moves = [getattr(cube, move) for move in MOVES]
+
+    def run():
+        for move in moves:
+            move()
+    return run
+
+
+@benchmark("piece.rotation", ops_per_call=6)
+def _piece_rotation():
+    piece = Piece(('W', 'B', 'O'))
+
+    def run():
+        piece.x_rotation()
+        piece.y_rotation()
+        piece.z_rotation()
+        piece.reverse_z_rotation()
+        piece.reverse_y_rotation()
+        piece.reverse_x_rotation()
+    return run
+
+
+@benchmark("env.step_1024", ops_per_call=1024)
+def _env_step():
+    env = CubeEnv(1024, seed=0)
+    actions = np.random.default_rng(0).integers(0, len(MOVES), 1024)
+    return lambda: env.step(actions)
+
+
+_AGENT = None
+_AGENT_DIR = None
+
+
+def _agent():
+    # one agent for every DQN benchmark, without touching the checkpoints under models/
+    global _AGENT, _AGENT_DIR
+    if _AGENT is None:
+        from dqnAgent import NUM_ACTIONS, DQNAgent
+
+        rng = np.random.default_rng(0)
+        _AGENT_DIR = tempfile.TemporaryDirectory()
+        atexit.register(_AGENT_DIR.cleanup)
+        _AGENT = DQNAgent(NUM_STICKERS, buffer_size=10_000, model_path=os.path.join(_AGENT_DIR.name, "none.keras"))
+        count = _AGENT.replay_buffer.capacity
+        _AGENT.remember_batch(
+            rng.integers(0, 6, (count, NUM_STICKERS)), rng.integers(0, NUM_ACTIONS, count),
+            rng.normal(size=count), rng.integers(0, 6, (count, NUM_STICKERS)), rng.random(count) < 0.01,
+        )
+    return _AGENT
+
+
+for _batch in (1, 24, 256, 1024):
+    @benchmark(f"agent.act_batch_{_batch}", ops_per_call=_batch)
+    def _act_batch(batch=_batch):
+        states = np.random.default_rng(0).integers(0, 6, (batch, NUM_STICKERS), dtype=np.uint8)
+        agent = _agent()
+        return lambda: agent.act_batch(states, 0.1)
+
+
+@benchmark("agent.replay_128", ops_per_call=128)
+def _replay():
+    agent = _agent()
+    return lambda: agent.replay(128)
+
+
+@benchmark("agent.train_step_128", ops_per_call=128)
+def _train_step():
+    agent = _agent()
+    batch = agent.replay_buffer.sample(128)
+    weights = np.ones(128, dtype=np.float32)
+    return lambda: agent._train_step(*batch, weights)
+
+
+@benchmark("agent.replay_many_10x128", ops_per_call=1280)
+def _replay_many():
+    agent = _agent()
+    return lambda: agent.replay_many(10, 128)
+
+
+def run(names, min_time: float = MIN_TIME, repeats: int = REPEATS) -> dict:
+    # each round times every benchmark once, so a slow stretch on the host costs each benchmark
+    # one sample instead of every sample of whichever benchmark it overlapped
+    functions = {name: BENCHMARKS[name][0]() for name in names}
+    calls = {name: calibrate(functions[name], min_time) for name in names}
+    samples: dict[str, list[float]] = {name: [] for name in names}
+    references: dict[str, list[float]] = {name: [] for name in names}
+    for _ in range(repeats):
+        for name in names:
+            references[name].append(time_calls(_reference, 1))
+            samples[name].append(time_calls(functions[name], calls[name]))
+
+    results = {}
+    for name in names:
+        ops_per_call = BENCHMARKS[name][1]
+        ops = ops_per_call / float(np.median(samples[name]))
+        relative = ops_per_call * float(np.median(np.divide(references[name], samples[name])))
+        results[name] = {"ops_per_sec": ops, "ns_per_op": 1e9 / ops, "ops_per_reference": relative}
+        print(f"{name:<28} {ops:>14,.0f} ops/s {1e9 / ops:>12,.0f} ns/op")
+    return {
+        "meta": {
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "cpus": os.cpu_count(),
+            "min_time": min_time,
+            "repeats": repeats,
+        },
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    # a benchmark regresses when it is more than `tolerance` slower than its baseline, measured
+    # against the reference loop so the host's speed at the time cancels out
+    regressions = []
+    for name, result in report["results"].items():
+        if name not in baseline["results"]:
+            continue
+        expected = baseline["results"][name]["ops_per_reference"]
+        ratio = result["ops_per_reference"] / expected
+        marker = "REGRESSION" if ratio < 1 - tolerance else "ok"
+        print(f"{name:<28} {ratio:6.2f}x of baseline  {marker}")
+        if ratio < 1 - tolerance:
+            regressions.append(name)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless microbenchmarks for the cube engine and agent")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--min-time", type=float, default=MIN_TIME)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--output", default=None, help="write the JSON report here")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before a benchmark counts as regressed")
+    parser.add_argument("--retries", type=int, default=2, help="re-measure apparent regressions this many times")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        expected = {key: baseline["meta"].get(key) for key in SETTINGS}
+        actual = {"min_time": args.min_time, "repeats": args.repeats, "cpus": os.cpu_count()}
+        if expected != actual:
+            parser.error(f"{args.baseline} was recorded with {expected}, this run uses {actual}; "
+                         f"rerun with the same settings or record a new baseline with --save-baseline")
+
+    report = run([name for name in BENCHMARKS if args.filter in name], args.min_time, args.repeats)
+
+    regressions = []
+    if baseline is not None:
+        regressions = compare(report, baseline, args.tolerance)
+        # one slow stretch on the host can sink a benchmark, so a regression has to survive fresh runs
+        for _ in range(args.retries):
+            if not regressions:
+                break
+            print(f"re-measuring {', '.join(regressions)}")
+            retry = run(regressions, args.min_time, args.repeats)
+            for name, result in retry["results"].items():
+                if result["ops_per_reference"] > report["results"][name]["ops_per_reference"]:
+                    report["results"][name] = result
+            regressions = compare(retry, baseline, args.tolerance)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"wrote {args.baseline}")
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
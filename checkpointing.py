@@ -0,0 +1,119 @@
+import json
+import os
+import shutil
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+import tensorflow as tf
+import keras
+
+CHECKPOINT_DIR = "models/run"
+CHECKPOINT_PREFIX = "ckpt-"
+
+
+def _optimizer_variables(optimizer) -> list:
+    # a method on the legacy Keras optimizers, a property on the new ones
+    variables = optimizer.variables
+    return list(variables() if callable(variables) else variables)
+
+
+class Checkpointer:
+    def __init__(self, directory: str = CHECKPOINT_DIR, keep: int = 3):
+        self.directory = directory
+        self.keep = keep
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="checkpoint")
+        self._pending: Future | None = None
+        self._export_model: keras.Model | None = None
+        os.makedirs(directory, exist_ok=True)
+
+    def checkpoints(self) -> list[str]:
+        names = sorted(n for n in os.listdir(self.directory) if n.startswith(CHECKPOINT_PREFIX))
+        return [os.path.join(self.directory, n) for n in names]
+
+    def latest(self) -> str | None:
+        checkpoints = self.checkpoints()
+        return checkpoints[-1] if checkpoints else None
+
+    def save(self, agent, iteration: int, state: dict | None = None) -> Future:
+        # only the copy of the weights happens on the caller's thread; all file I/O is on the worker
+        self.wait()
+        if self._export_model is None:
+            self._export_model = agent._build_model()
+        snapshot = {
+            "model": agent.model.get_weights(),
+            "target": agent.target_model.get_weights(),
+            "optimizer": [v.numpy() for v in _optimizer_variables(agent.model.optimizer)],
+            "state": {
+                **(state or {}),
+                "iteration": iteration,
+                "gamma": agent.gamma,
+                "prioritized": agent.prioritized,
+                "replay": agent.replay_buffer.state_dict(),
+            },
+        }
+        self._pending = self._executor.submit(self._write, agent, iteration, snapshot)
+        return self._pending
+
+    def _write(self, agent, iteration: int, snapshot: dict):
+        agent.replay_buffer.flush()
+
+        path = os.path.join(self.directory, f"{CHECKPOINT_PREFIX}{iteration:09d}")
+        partial = path + ".partial"
+        shutil.rmtree(partial, ignore_errors=True)
+        os.makedirs(partial)
+        arrays = {}
+        for group in ("model", "target", "optimizer"):
+            arrays.update({f"{group}_{i}": w for i, w in enumerate(snapshot[group])})
+        np.savez(os.path.join(partial, "weights.npz"), **arrays)
+        with open(os.path.join(partial, "state.json"), "w") as f:
+            json.dump(snapshot["state"], f)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(partial, path)
+
+        # keep the plain .keras checkpoint that solveThisB and the exporters load
+        self._export_model.set_weights(snapshot["model"])
+        self._export_model.save(agent.model_path)
+
+        for old in self.checkpoints()[:-self.keep]:
+            shutil.rmtree(old, ignore_errors=True)
+        return path
+
+    def wait(self):
+        if self._pending is not None:
+            self._pending.result()
+            self._pending = None
+
+    def restore(self, agent, path: str | None = None) -> dict | None:
+        path = path or self.latest()
+        if path is None:
+            return None
+
+        with np.load(os.path.join(path, "weights.npz")) as arrays:
+            groups = {
+                group: [arrays[f"{group}_{i}"] for i in range(sum(k.startswith(f"{group}_") for k in arrays.files))]
+                for group in ("model", "target", "optimizer")
+            }
+        with open(os.path.join(path, "state.json")) as f:
+            state = json.load(f)
+
+        agent.model.set_weights(groups["model"])
+        agent.target_model.set_weights(groups["target"])
+
+        # optimizer slots only exist after a first update, so apply a zero step before assigning them
+        optimizer = agent.model.optimizer
+        variables = agent.model.trainable_variables
+        if len(_optimizer_variables(optimizer)) != len(groups["optimizer"]):
+            optimizer.apply_gradients(zip([tf.zeros_like(v) for v in variables], variables))
+        for variable, value in zip(_optimizer_variables(optimizer), groups["optimizer"]):
+            variable.assign(value)
+
+        agent.gamma = state["gamma"]
+        # checkpoints written before the mode was recorded only carry beta when prioritized
+        prioritized = state.get("prioritized", "beta" in state["replay"])
+        if prioritized == agent.prioritized:
+            agent.replay_buffer.load_state_dict(state["replay"])
+        else:
+            print(f"{path} was saved with prioritized={prioritized}, starting with an empty replay buffer")
+            agent.replay_buffer.reset()
+        print(f"Restored {path} (iteration {state['iteration']}, {len(agent.replay_buffer)} transitions)")
+        return state
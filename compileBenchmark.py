@@ -0,0 +1,61 @@
+import argparse
+import time
+
+import numpy as np
+
+from cubeLayout import NUM_STICKERS
+from dqnAgent import NUM_ACTIONS, DQNAgent
+
+MODES = {
+    "graph": dict(jit_compile=False, mixed_precision=False),
+    "xla": dict(jit_compile=True, mixed_precision=False),
+    "graph+bf16": dict(jit_compile=False, mixed_precision=True),
+    "xla+bf16": dict(jit_compile=True, mixed_precision=True),
+}
+
+
+def _time(function, repeats: int) -> float:
+    function()  # trace and compile outside the timed region
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - start) / repeats
+
+
+def benchmark_mode(name: str, num_cubes: int = 24, batch_size: int = 128, train_steps: int = 10,
+                   repeats: int = 50, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    agent = DQNAgent(NUM_STICKERS, model_path="", buffer_size=10_000, **MODES[name])
+    count = agent.replay_buffer.capacity
+    agent.remember_batch(
+        rng.integers(0, 6, (count, NUM_STICKERS)), rng.integers(0, NUM_ACTIONS, count),
+        rng.normal(size=count), rng.integers(0, 6, (count, NUM_STICKERS)), rng.random(count) < 0.01,
+    )
+    states = rng.integers(0, 6, (num_cubes, NUM_STICKERS), dtype=np.uint8)
+
+    act = _time(lambda: agent.act_batch(states, 0.1), repeats)
+    train = _time(lambda: agent.replay_many(train_steps, batch_size), repeats)
+    return {"mode": name, "act_ms": act * 1e3, "train_ms": train * 1e3, "iteration_ms": (act + train) * 1e3}
+
+
+def report(results: list[dict]):
+    baseline = results[0]["iteration_ms"]
+    print(f"{'mode':<12} {'act ms':>8} {'train ms':>9} {'iter ms':>8} {'speedup':>8}")
+    for r in results:
+        print(f"{r['mode']:<12} {r['act_ms']:8.2f} {r['train_ms']:9.2f} {r['iteration_ms']:8.2f} "
+              f"{baseline / r['iteration_ms']:7.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time DQNAgent action selection and training in each compile mode")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--cubes", type=int, default=24)
+    parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--train-steps", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    report([
+        benchmark_mode(mode, args.cubes, args.batch_size, args.train_steps, args.repeats)
+        for mode in args.modes
+    ])
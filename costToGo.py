@@ -0,0 +1,161 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import tensorflow as tf
+import keras
+
+from cubeLayout import MOVE_TABLES, NUM_STICKERS, SOLVED_STATE
+from modelLayers import OneHotStates, load_weights
+from scrambler import scramble_actions
+
+os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"
+
+MODEL_PATH = "models/cost_to_go.keras"
+
+
+def backward_scrambles(count: int, max_depth: int, seed=None) -> tuple[np.ndarray, np.ndarray]:
+    # walk out from the solved state and stop each row at its own depth in 1..max_depth
+    rng = np.random.default_rng(seed)
+    depths = rng.integers(1, max_depth + 1, size=count)
+    actions = scramble_actions(count, max_depth, rng)
+    states = np.tile(SOLVED_STATE, (count, 1))
+    for step in range(max_depth):
+        active = np.flatnonzero(depths > step)
+        states[active] = np.take_along_axis(states[active], MOVE_TABLES[actions[active, step]], axis=1)
+    return states, depths
+
+
+class CostToGoAgent:
+    def __init__(
+        self,
+        state_size: int = NUM_STICKERS,
+        hidden_units: int = 512,
+        hidden_layers: int = 4,
+        learning_rate: float = 1e-3,
+        model_path: str = MODEL_PATH,
+    ):
+        self.state_size = state_size
+        self.hidden_units = hidden_units
+        self.hidden_layers = hidden_layers
+        self.learning_rate = learning_rate
+        self.model_path = model_path
+        os.makedirs(os.path.dirname(model_path) or ".", exist_ok=True)
+
+        self.model = self._build_model()
+        self.target_model = self._build_model()
+        self.load()
+        self.update_target()
+
+    def _build_model(self) -> keras.Sequential:
+        model = keras.Sequential([
+            keras.layers.Input(shape=(self.state_size,), dtype="uint8"),
+            OneHotStates(),
+        ])
+        for _ in range(self.hidden_layers):
+            model.add(keras.layers.Dense(self.hidden_units))
+            model.add(keras.layers.LeakyReLU(alpha=0.01))
+            model.add(keras.layers.BatchNormalization())
+        model.add(keras.layers.Dense(1))
+        model.compile(optimizer=keras.optimizers.Adam(self.learning_rate), loss="mse")
+        return model
+
+    def update_target(self):
+        self.target_model.set_weights(self.model.get_weights())
+
+    def cost_to_go(self, states: np.ndarray, model=None) -> np.ndarray:
+        model = model or self.model
+        states = np.atleast_2d(states)
+        costs = np.maximum(model(states, training=False).numpy()[:, 0], 0.0)
+        costs[(states == SOLVED_STATE).all(axis=1)] = 0.0
+        return costs
+
+    def targets(self, states: np.ndarray) -> np.ndarray:
+        # all 12 children of every state in one gather and one network call
+        children = states[:, MOVE_TABLES].reshape(-1, states.shape[1])
+        child_costs = self.cost_to_go(children, self.target_model).reshape(len(states), len(MOVE_TABLES))
+        targets = 1.0 + child_costs.min(axis=1)
+        targets[(states == SOLVED_STATE).all(axis=1)] = 0.0
+        return targets.astype(np.float32)
+
+    @tf.function
+    def _train_step(self, states, targets):
+        with tf.GradientTape() as tape:
+            predictions = self.model(states, training=True)[:, 0]
+            loss = tf.reduce_mean(tf.square(targets - predictions))
+        grads = tape.gradient(loss, self.model.trainable_variables)
+        self.model.optimizer.apply_gradients(zip(grads, self.model.trainable_variables))
+        return loss
+
+    def train_step(self, states: np.ndarray, targets: np.ndarray):
+        return self._train_step(states, targets)
+
+    def save(self):
+        self.model.save(self.model_path)
+
+    def load(self, input_path=None):
+        path = input_path if input_path else self.model_path
+        if os.path.exists(path):
+            load_weights(self.model, path)
+        else:
+            print("No model to load")
+
+
+class ValueIterationTrainer:
+    def __init__(
+        self,
+        agent: CostToGoAgent | None = None,
+        batch_size: int = 1000,
+        max_depth: int = 30,
+        update_every: int = 500,
+        loss_threshold: float = 0.05,
+        seed=None,
+    ):
+        self.agent = agent or CostToGoAgent()
+        self.batch_size = batch_size
+        self.max_depth = max_depth
+        self.update_every = update_every
+        self.loss_threshold = loss_threshold
+        self.rng = np.random.default_rng(seed)
+        self.iteration = 0
+
+    def step(self) -> float:
+        states, _ = backward_scrambles(self.batch_size, self.max_depth, self.rng)
+        targets = self.agent.targets(states)
+        loss = float(self.agent.train_step(states, targets))
+
+        # refresh the target network on schedule, or early once the current targets are fit
+        self.iteration += 1
+        if self.iteration % self.update_every == 0 or loss < self.loss_threshold:
+            self.agent.update_target()
+        return loss
+
+    def run(self, num_iterations: int = 100_000, log_every: int = 100, save_every: int = 1000):
+        start = time.perf_counter()
+        for _ in range(num_iterations):
+            loss = self.step()
+            if self.iteration % log_every == 0:
+                rate = self.iteration * self.batch_size / (time.perf_counter() - start)
+                print(f"Iteration {self.iteration}: loss={loss:.4f} ({rate:.0f} states/s)")
+            if self.iteration % save_every == 0:
+                self.agent.save()
+        self.agent.save()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fit a cost-to-go network with approximate value iteration")
+    parser.add_argument("--iterations", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--max-depth", type=int, default=30)
+    parser.add_argument("--update-every", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    trainer = ValueIterationTrainer(
+        batch_size=args.batch_size,
+        max_depth=args.max_depth,
+        update_every=args.update_every,
+        seed=args.seed,
+    )
+    trainer.run(args.iterations)
@@ -1,14 +1,76 @@
 import os
-import random
-from cubePieces import Piece
-from Constants import colors
+from cubePieces import FACES, Piece, color_decoding
+from cubeLayout import INVERSE_MOVE_NAMES, MOVE_INDEX, MOVE_TABLES, NUM_STICKERS, SOLVED_STATE, STICKER_SLOTS
+from stateEncoding import encode_state
+from moveSequence import compile_getter
+from scrambler import scramble_state
+from Constants import colors, MOVES
 from itertools import product
 
 FRONT_COLORS, TOP_COLORS, SIDE_COLORS = colors
 
+SOLVED = tuple(SOLVED_STATE.tolist())
+SOLVED_MASK = (1 << NUM_STICKERS) - 1
+# _CORRECT_BITS[i][color] is the bit sticker i contributes to the correct mask when showing color
+_CORRECT_BITS = [[1 << i if color == solved else 0 for color in range(6)] for i, solved in enumerate(SOLVED)]
+_MOVE_GETTERS = {move: compile_getter(move) for move in MOVES}
+_MOVE_TOUCHED = {
+    move: [i for i, source in enumerate(MOVE_TABLES[MOVE_INDEX[move]].tolist()) if i != source]
+    for move in MOVES
+}
+_MOVE_TOUCHED_MASKS = {move: sum(1 << i for i in touched) for move, touched in _MOVE_TOUCHED.items()}
+# _PIECE_STICKERS[(layer, index)] lists the (face position, sticker index) pairs of that piece
+_PIECE_STICKERS: dict[tuple[int, int], list[tuple[int, int]]] = {}
+for _i, (_layer, _index, _face) in enumerate(STICKER_SLOTS):
+    _PIECE_STICKERS.setdefault((_layer, _index), []).append((FACES.index(_face), _i))
+
+
+def correct_mask(state) -> int:
+    return sum(_CORRECT_BITS[i][int(color)] for i, color in enumerate(state))
+
+def _build_solved_pieces() -> list[list[Piece]]:
+    corners: list[Piece] = []
+    sides: list[Piece] = []
+    centers: list[Piece] = []
+
+    for i,j,k in product(FRONT_COLORS,TOP_COLORS, SIDE_COLORS):
+        corners.append(Piece([i,j,k]))
+        if Piece([j,i]) not in sides and Piece([i,j]) not in sides:
+            sides.append(Piece([i,j]))
+        if Piece([k,j]) not in sides and Piece([j,k]) not in sides:
+            sides.append(Piece([j,k]))
+        if Piece([k,i]) not in sides and Piece([i,k]) not in sides:
+            sides.append(Piece([i,k]))
+
+    centers = [(Piece(color)) for color in FRONT_COLORS + SIDE_COLORS + TOP_COLORS]
+    corners.sort(reverse=True)
+    sides.sort(reverse=True)
+    centers.sort(reverse=True)
+    return \
+    [[corners[0].reverse_y_rotation(), sides[0].reverse_y_rotation(), corners[1].reverse_y_rotation().x_flip(), 
+    sides[2].x_flip(), centers[0], sides[3],
+    corners[2].z_flip().y_rotation(), sides[1].y_rotation(), corners[3].y_rotation()],
+    [sides[8].z_rotation().x_flip(), centers[2].z_rotation(), sides[9].z_rotation(),
+    centers[4].reverse_x_rotation(), Piece('X'), centers[5].x_rotation(),
+    sides[10].x_flip().reverse_z_rotation(), centers[3].reverse_z_rotation(), sides[11].reverse_z_rotation()],
+    [corners[4].reverse_y_rotation().y_flip(), sides[4].reverse_y_rotation().y_flip(), corners[5].y_flip().reverse_y_rotation().x_flip(),
+    sides[6].x_rotation().x_rotation(), centers[1].y_flip(), sides[7].y_flip(),
+    corners[6].y_flip().x_flip().reverse_y_rotation(), sides[5].y_rotation().y_flip(), corners[7].y_rotation().y_flip()]]
+
+
+# built once; cubes copy from it and it is never handed out or mutated
+SOLVED_PIECES = tuple(tuple(layer) for layer in _build_solved_pieces())
+
+
+def reset_cubes(cubes):
+    for cube in cubes:
+        cube.make_solved_cube()
+
+
 class Cube:
     def __init__(self):
         self._pieces: list[list[Piece]] = []
+        self._history: list[str] = []
         self.make_solved_cube()
     
     def __repr__(self):
@@ -21,49 +83,72 @@ class Cube:
             return NotImplemented
         return self._pieces == other._pieces
 
+    def __hash__(self):
+        return hash(encode_state(self._state))
+
+    def copy(self) -> "Cube":
+        cube = Cube.__new__(Cube)
+        cube._pieces = [[piece.copy() for piece in layer] for layer in self._pieces]
+        cube._history = self._history.copy()
+        cube._state = self._state
+        cube._correct = self._correct
+        return cube
+
+    def push(self, move: str):
+        getattr(self, move)()
+        self._history.append(move)
+
+    def pop(self) -> str:
+        move = self._history.pop()
+        getattr(self, INVERSE_MOVE_NAMES[move])()
+        return move
+
+    @property
+    def history(self) -> list[str]:
+        return self._history.copy()
+
     def get_state(self):
-        state = []
-        for face in self._pieces:
-            for piece in face:
-                state.extend(piece.get_colors())
-        return state
+        return list(self._state)
+
+    def set_state(self, state):
+        for (layer, index), stickers in _PIECE_STICKERS.items():
+            colors = ['X'] * len(FACES)
+            for face, i in stickers:
+                colors[face] = color_decoding[int(state[i])]
+            self._pieces[layer][index].set_colors(colors)
+        self._history.clear()
+        self._state = tuple(int(value) for value in state)
+        self._correct = correct_mask(self._state)
+
+    def _track(self, move: str):
+        state = _MOVE_GETTERS[move](self._state)
+        correct = self._correct & ~_MOVE_TOUCHED_MASKS[move]
+        for i in _MOVE_TOUCHED[move]:
+            correct |= _CORRECT_BITS[i][state[i]]
+        self._state = state
+        self._correct = correct
+
+    @property
+    def correct_mask(self) -> int:
+        return self._correct
+
+    @property
+    def num_correct(self) -> int:
+        return self._correct.bit_count()
 
     def is_solved(self):
-        face_size = 6
-        for face in self._pieces:
-            colors = [piece.get_colors()[0] for piece in face]
-            if len(set(colors)) != 1:
-                return False
-        return True
+        return self._correct == SOLVED_MASK
 
     def make_solved_cube(self):
-        corners: list[Piece] = []
-        sides: list[Piece] = []
-        centers: list[Piece] = []
-
-        for i,j,k in product(FRONT_COLORS,TOP_COLORS, SIDE_COLORS):
-            corners.append(Piece([i,j,k]))
-            if Piece([j,i]) not in sides and Piece([i,j]) not in sides:
-                sides.append(Piece([i,j]))
-            if Piece([k,j]) not in sides and Piece([j,k]) not in sides:
-                sides.append(Piece([j,k]))
-            if Piece([k,i]) not in sides and Piece([i,k]) not in sides:
-                sides.append(Piece([i,k]))
-
-        centers = [(Piece(color)) for color in FRONT_COLORS + SIDE_COLORS + TOP_COLORS]
-        corners.sort(reverse=True)
-        sides.sort(reverse=True)
-        centers.sort(reverse=True)
-        self._pieces = \
-        [[corners[0].reverse_y_rotation(), sides[0].reverse_y_rotation(), corners[1].reverse_y_rotation().x_flip(), 
-        sides[2].x_flip(), centers[0], sides[3],
-        corners[2].z_flip().y_rotation(), sides[1].y_rotation(), corners[3].y_rotation()],
-        [sides[8].z_rotation().x_flip(), centers[2].z_rotation(), sides[9].z_rotation(),
-        centers[4].reverse_x_rotation(), Piece('X'), centers[5].x_rotation(),
-        sides[10].x_flip().reverse_z_rotation(), centers[3].reverse_z_rotation(), sides[11].reverse_z_rotation()],
-        [corners[4].reverse_y_rotation().y_flip(), sides[4].reverse_y_rotation().y_flip(), corners[5].y_flip().reverse_y_rotation().x_flip(),
-        sides[6].x_rotation().x_rotation(), centers[1].y_flip(), sides[7].y_flip(),
-        corners[6].y_flip().x_flip().reverse_y_rotation(), sides[5].y_rotation().y_flip(), corners[7].y_rotation().y_flip()]]
+        if self._pieces:
+            for layer, solved_layer in zip(self._pieces, SOLVED_PIECES):
+                for piece, solved_piece in zip(layer, solved_layer):
+                    piece.assign(solved_piece)
+        else:
+            self._pieces = [[piece.copy() for piece in layer] for layer in SOLVED_PIECES]
+        self._history.clear()
+        self._state = SOLVED
+        self._correct = SOLVED_MASK
         
     def U(self):
         indexes = [(i,j) for i in range(3) for j in range(3)]
@@ -75,6 +160,7 @@ class Cube:
                           ]))
         for (i,j), piece in zip(indexes, face):
             self._pieces[i][j] = piece
+        self._track("U")
 
     def Ud(self):
         indexes = [(i,j) for i in range(3) for j in range(3)]
@@ -86,6 +172,7 @@ class Cube:
                         ]))
         for (i,j), piece in zip(indexes, face):
             self._pieces[i][j] = piece
+        self._track("Ud")
 
     def D(self):
         indexes = [(i,-1-j) for i in range(3) for j in range(3)]
@@ -97,6 +184,7 @@ class Cube:
                         ]))
         for (i,j), piece in zip(indexes, face):
             self._pieces[i][j] = piece
+        self._track("D")
 
     def Dd(self):
         indexes = [(i,-1-j) for i in range(3) for j in range(3)]
@@ -108,6 +196,7 @@ class Cube:
                         ]))
         for (i,j), piece in zip(indexes, face):
             self._pieces[i][j] = piece
+        self._track("Dd")
 
     def R(self):
         indexes = [(i,-1-3*j) for i in range(3) for j in range(3)]
@@ -119,6 +208,7 @@ class Cube:
                         ]))
         for (i,j), piece in zip(indexes, face):
             self._pieces[i][j] = piece
+        self._track("R")
 
     def Rd(self):
         indexes = [(i,-1-3*j) for i in range(3) for j in range(3)]
@@ -130,6 +220,7 @@ class Cube:
                         ]))
         for (i,j), piece in zip(indexes, face):
             self._pieces[i][j] = piece
+        self._track("Rd")
 
     def L(self):
         indexes = [(i, 3*j) for i in range(3) for j in range(3)]
@@ -141,6 +232,7 @@ class Cube:
                         ]))
         for (i,j), piece in zip(indexes, face):
             self._pieces[i][j] = piece
+        self._track("L")
 
     def Ld(self):
         indexes = [(i, 3*j) for i in range(3) for j in range(3)]
@@ -152,6 +244,7 @@ class Cube:
                         ]))
         for (i,j), piece in zip(indexes, face):
             self._pieces[i][j] = piece
+        self._track("Ld")
 
     def F(self):
         face = self._pieces[0]
@@ -160,6 +253,7 @@ class Cube:
                         face[7], face[4], face[1],
                         face[8], face[5], face[2]
                         ]))
+        self._track("F")
     
     def Fd(self):
         face = self._pieces[0]
@@ -168,6 +262,7 @@ class Cube:
                         face[1], face[4], face[7],
                         face[0], face[3], face[6]
                         ]))
+        self._track("Fd")
 
     def B(self):
         face = self._pieces[2]
@@ -176,6 +271,7 @@ class Cube:
                         face[1], face[4], face[7],
                         face[0], face[3], face[6]
                         ]))
+        self._track("B")
 
     def Bd(self):
         face = self._pieces[2]
@@ -184,12 +280,14 @@ class Cube:
                         face[7], face[4], face[1],
                         face[8], face[5], face[2]
                         ]))
+        self._track("Bd")
 
     @property
     def moves(self):
         return ["U","Ud","D","Dd","R","Rd","L","Ld","F","Fd","B","Bd"]    
 
-    def scramble(self):
-        for _ in range(25):
-            move = random.choice(self.moves)
-            getattr(self, move)()
\ No newline at end of file
+    def apply_sequence(self, sequence):
+        self.set_state(compile_getter(sequence)(self._state))
+
+    def scramble(self, depth: int = 25, seed=None):
+        self.set_state(scramble_state(depth, seed))
\ No newline at end of file
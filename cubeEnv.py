@@ -0,0 +1,65 @@
+import numpy as np
+
+from cubeLayout import INVERSE_MOVES, MOVE_TABLES, NUM_STICKERS, SOLVED_STATE
+from scrambler import random_states, scramble_states
+
+
+class CubeEnv:
+    def __init__(self, num_cubes: int, max_steps: int = 1000, scramble_moves: int | None = 25, seed=None):
+        self.num_cubes = num_cubes
+        self.max_steps = max_steps
+        self.scramble_moves = scramble_moves
+        self.rng = np.random.default_rng(seed)
+
+        self.states = np.empty((num_cubes, NUM_STICKERS), dtype=np.uint8)
+        self.last_actions = np.full(num_cubes, -1, dtype=np.int64)
+        self.rewarded = np.zeros((num_cubes, NUM_STICKERS), dtype=bool)
+        self.step_counts = np.zeros(num_cubes, dtype=np.int64)
+        self.episode_rewards = np.zeros(num_cubes, dtype=np.float32)
+        self.solved = np.zeros(num_cubes, dtype=bool)
+        self.reset()
+
+    def _scrambled(self, count: int) -> np.ndarray:
+        if self.scramble_moves is None:
+            return random_states(count, self.rng)
+        states, _ = scramble_states(count, self.scramble_moves, self.rng)
+        return states
+
+    def reset(self, mask=None, scramble: bool = True):
+        indices = np.arange(self.num_cubes) if mask is None else np.flatnonzero(mask)
+        if len(indices) == 0:
+            return self.states
+
+        # copy so rows handed out by an earlier step() are never overwritten
+        states = self.states.copy()
+        states[indices] = self._scrambled(len(indices)) if scramble else SOLVED_STATE
+        self.states = states
+
+        self.last_actions[indices] = -1
+        self.rewarded[indices] = False
+        self.step_counts[indices] = 0
+        self.episode_rewards[indices] = 0.0
+        self.solved[indices] = False
+        return self.states
+
+    def step(self, actions):
+        actions = np.asarray(actions, dtype=np.int64)
+        next_states = np.take_along_axis(self.states, MOVE_TABLES[actions], axis=1)
+
+        rewards = np.full(self.num_cubes, -0.1, dtype=np.float32)
+        rewards[INVERSE_MOVES[actions] == self.last_actions] -= 1.0
+
+        correct = next_states == SOLVED_STATE
+        rewards += 0.5 * (correct & ~self.rewarded).sum(axis=1)
+        self.rewarded |= correct
+
+        self.solved = correct.all(axis=1)
+        rewards[self.solved] += 100.0
+
+        self.step_counts += 1
+        dones = self.solved | (self.step_counts >= self.max_steps)
+
+        self.states = next_states
+        self.last_actions = actions
+        self.episode_rewards += rewards
+        return next_states, rewards, dones
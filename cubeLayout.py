@@ -0,0 +1,115 @@
+import numpy as np
+from cubePieces import color_onehotencoding
+from Constants import MOVES
+
+FACES = ('F', 'B', 'R', 'L', 'T', 'D')
+FACE_NORMALS = {
+    'F': (0, 0, 1), 'B': (0, 0, -1),
+    'R': (1, 0, 0), 'L': (-1, 0, 0),
+    'T': (0, 1, 0), 'D': (0, -1, 0),
+}
+FACE_COLORS = {'F': 'W', 'B': 'Y', 'R': 'B', 'L': 'G', 'T': 'O', 'D': 'R'}
+
+# move name -> (axis, layer coordinate on that axis, quarter turns about +axis)
+MOVE_DEFINITIONS = {
+    'U': (1, 1, 1), 'Ud': (1, 1, -1),
+    'D': (1, -1, 1), 'Dd': (1, -1, -1),
+    'R': (0, 1, -1), 'Rd': (0, 1, 1),
+    'L': (0, -1, 1), 'Ld': (0, -1, -1),
+    'F': (2, 1, -1), 'Fd': (2, 1, 1),
+    'B': (2, -1, 1), 'Bd': (2, -1, -1),
+}
+
+
+def piece_position(layer: int, index: int) -> tuple[int, int, int]:
+    return (index % 3 - 1, 1 - index // 3, 1 - layer)
+
+
+def _rotate(vector: tuple[int, int, int], axis: int, turns: int) -> tuple[int, int, int]:
+    x, y, z = vector
+    for _ in range(turns % 4):
+        if axis == 0:
+            x, y, z = x, -z, y
+        elif axis == 1:
+            x, y, z = z, y, -x
+        else:
+            x, y, z = -y, x, z
+    return (x, y, z)
+
+
+def _build_sticker_slots() -> list[tuple[int, int, str]]:
+    slots = []
+    for layer in range(3):
+        for index in range(9):
+            position = piece_position(layer, index)
+            for face in FACES:
+                normal = FACE_NORMALS[face]
+                if any(n != 0 and n == p for n, p in zip(normal, position)):
+                    slots.append((layer, index, face))
+    return slots
+
+
+# STICKER_SLOTS[i] is the (layer, index, face) that get_state() reads entry i from
+STICKER_SLOTS = _build_sticker_slots()
+NUM_STICKERS = len(STICKER_SLOTS)
+CENTER_STICKERS = np.array(
+    [i for i, (layer, index, _) in enumerate(STICKER_SLOTS)
+     if sum(c != 0 for c in piece_position(layer, index)) == 1]
+)
+
+SOLVED_STATE = np.array(
+    [color_onehotencoding[FACE_COLORS[face]] for _, _, face in STICKER_SLOTS], dtype=np.uint8
+)
+
+
+def _build_move_table(axis: int, coordinate: int, turns: int) -> np.ndarray:
+    lookup = {}
+    for i, (layer, index, face) in enumerate(STICKER_SLOTS):
+        lookup[(piece_position(layer, index), FACE_NORMALS[face])] = i
+
+    table = np.arange(NUM_STICKERS, dtype=np.intp)
+    for i, (layer, index, face) in enumerate(STICKER_SLOTS):
+        position = piece_position(layer, index)
+        if position[axis] != coordinate:
+            continue
+        source = (_rotate(position, axis, -turns), _rotate(FACE_NORMALS[face], axis, -turns))
+        table[i] = lookup[source]
+    return table
+
+
+# new_state = state[MOVE_TABLES[MOVE_INDEX[move]]]; rows follow Constants.MOVES
+MOVE_INDEX = {move: i for i, move in enumerate(MOVES)}
+MOVE_TABLES = np.stack([_build_move_table(*MOVE_DEFINITIONS[move]) for move in MOVES])
+INVERSE_MOVES = np.array([MOVE_INDEX[m[:-1] if m.endswith('d') else m + 'd'] for m in MOVES])
+INVERSE_MOVE_NAMES = {move: MOVES[inverse] for move, inverse in zip(MOVES, INVERSE_MOVES)}
+
+
+def _normal_determinant(a, b, c) -> int:
+    return (a[0] * (b[1] * c[2] - b[2] * c[1])
+            - a[1] * (b[0] * c[2] - b[2] * c[0])
+            + a[2] * (b[0] * c[1] - b[1] * c[0]))
+
+
+def _build_cubie_slots() -> tuple[np.ndarray, np.ndarray]:
+    # reference sticker first: the T/D sticker, or the F/B sticker for middle-layer edges;
+    # corner stickers then follow in the same rotational sense at every position
+    pieces: dict[tuple[int, int], list[int]] = {}
+    for i, (layer, index, _) in enumerate(STICKER_SLOTS):
+        pieces.setdefault((layer, index), []).append(i)
+
+    rank = {'T': 0, 'D': 0, 'F': 1, 'B': 1, 'R': 2, 'L': 2}
+    corners, edges = [], []
+    for stickers in pieces.values():
+        stickers.sort(key=lambda i: rank[STICKER_SLOTS[i][2]])
+        if len(stickers) == 3:
+            normals = [FACE_NORMALS[STICKER_SLOTS[i][2]] for i in stickers]
+            if _normal_determinant(*normals) < 0:
+                stickers[1], stickers[2] = stickers[2], stickers[1]
+            corners.append(stickers)
+        elif len(stickers) == 2:
+            edges.append(stickers)
+    return np.array(corners), np.array(edges)
+
+
+# CORNER_SLOTS[p] / EDGE_SLOTS[p] list the sticker indices of corner / edge position p
+CORNER_SLOTS, EDGE_SLOTS = _build_cubie_slots()
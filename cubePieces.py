@@ -1,4 +1,5 @@
 from functools import total_ordering
+from operator import itemgetter
 from Constants import colors
 
 FRONT_COLORS, TOP_COLORS, SIDE_COLORS = colors
@@ -10,6 +11,7 @@ color_onehotencoding = {
     'G': 4,
     'B': 5
 }
+color_decoding = {value: color for color, value in color_onehotencoding.items()}
 
 def compare_colors(color1: str, color2: str, index: int) -> bool:
     colors_list = colors[index]
@@ -27,92 +29,115 @@ def compare_colors(color1: str, color2: str, index: int) -> bool:
 
     return compare_colors(color1, color2, index + 1)
 
+FACES = ('F', 'B', 'R', 'L', 'T', 'D')
+COLOR_RANK = {color: rank for rank, color in enumerate(sum(colors, ()))}
+COLOR_RANK['X'] = len(COLOR_RANK)
+
+# each rotation is a gather over the (F, B, R, L, T, D) color tuple
+_X_ROTATION = itemgetter(3, 2, 0, 1, 4, 5)
+_Y_ROTATION = itemgetter(0, 1, 4, 5, 3, 2)
+_Z_ROTATION = itemgetter(5, 4, 2, 3, 0, 1)
+_REVERSE_X_ROTATION = itemgetter(2, 3, 1, 0, 4, 5)
+_REVERSE_Y_ROTATION = itemgetter(0, 1, 5, 4, 2, 3)
+_REVERSE_Z_ROTATION = itemgetter(4, 5, 2, 3, 1, 0)
+_X_FLIP = itemgetter(0, 1, 3, 2, 4, 5)
+_Y_FLIP = itemgetter(1, 0, 2, 3, 4, 5)
+_Z_FLIP = itemgetter(0, 1, 2, 3, 5, 4)
+_SORT_FACES = itemgetter(0, 2, 4)
+
 @total_ordering
 class Piece:
+    __slots__ = ('_colors', 'type')
+    _colors: tuple[str, ...]
+
     def __init__(self, colors: tuple[str, ...]):
         if len(colors) == 3:
-            self.colors = {'F': colors[0], 'B': 'X', 'R': colors[1], 'L': 'X', 'T': colors[2], 'D': 'X'}
+            self._colors = (colors[0], 'X', colors[1], 'X', colors[2], 'X')
             self.type = 'corner'
         if len(colors) == 2:
-            self.colors = {'F': colors[0], 'B': 'X', 'R': colors[1], 'L': 'X', 'T': 'X', 'D': 'X'}
+            self._colors = (colors[0], 'X', colors[1], 'X', 'X', 'X')
             self.type = 'side'
         if len(colors) == 1:
-            self.colors = {'F': colors[0], 'B': 'X', 'R': 'X', 'L': 'X', 'T': 'X', 'D': 'X'}
+            self._colors = (colors[0], 'X', 'X', 'X', 'X', 'X')
             self.type = 'center'
-    
+
+    @property
+    def colors(self) -> dict[str, str]:
+        return dict(zip(FACES, self._colors))
+
+    def set_colors(self, colors: tuple[str, ...]):
+        self._colors = tuple(colors)
+
+    def assign(self, other: "Piece"):
+        self._colors = other._colors
+
+    def copy(self) -> "Piece":
+        piece = Piece.__new__(Piece)
+        piece._colors = self._colors
+        piece.type = self.type
+        return piece
+
     def __repr__(self):
-        return f"{tuple((face, color) for face, color in self.colors.items() if color != 'X')}"
+        return f"{tuple((face, color) for face, color in zip(FACES, self._colors) if color != 'X')}"
     
     def __str__(self):
+        front, _, right, _, top, _ = self._colors
         if self.type == 'corner':
-            return f"Piece Type: Corner, Front: {self.colors['F']}, Right: {self.colors['R']}, Top: {self.colors['T']}"
+            return f"Piece Type: Corner, Front: {front}, Right: {right}, Top: {top}"
         if self.type == 'side':
-            return f"Piece Type: Side, Front: {self.colors['F']}, Right: {self.colors['R']}"
+            return f"Piece Type: Side, Front: {front}, Right: {right}"
         if self.type == 'center':
-            return f"Piece Type: Center, Color: {self.colors['F']}"
+            return f"Piece Type: Center, Color: {front}"
         return "Invalid piece"
 
     def __eq__(self, other):
         if not isinstance(other, Piece):
             return NotImplemented
-        return self.colors == other.colors
+        return self._colors == other._colors
+
+    def sort_key(self) -> tuple[int, ...]:
+        return tuple(COLOR_RANK[color] for color in _SORT_FACES(self._colors))
     
     def __gt__(self, other):
         if not isinstance(other, Piece):
             return NotImplemented
-
-        if compare_colors(self.colors['F'], other.colors['F'], 0):
-            return True
-        if self.colors['F'] == other.colors['F']:
-            if compare_colors(self.colors['R'], other.colors['R'], 0):
-                return True
-            if self.colors['R'] == other.colors['R']:
-                if compare_colors(self.colors['T'], other.colors['T'], 0):
-                    return True
-        return False
+        return self.sort_key() < other.sort_key()
 
     def get_colors(self):
-        output = [color_onehotencoding[color] for color in self.colors.values() if color != 'X']
-        return output
+        return [color_onehotencoding[color] for color in self._colors if color != 'X']
 
     def x_rotation(self):
-        self.colors['F'], self.colors['B'], self.colors['R'], self.colors['L'] = \
-        self.colors['L'], self.colors['R'], self.colors['F'], self.colors['B']
+        self._colors = _X_ROTATION(self._colors)
         return self
 
     def y_rotation(self):
-        self.colors['R'], self.colors['L'], self.colors['T'], self.colors['D'] = \
-        self.colors['T'], self.colors['D'], self.colors['L'], self.colors['R']
+        self._colors = _Y_ROTATION(self._colors)
         return self
     
     def z_rotation(self):
-        self.colors['F'], self.colors['B'], self.colors['T'], self.colors['D'] = \
-        self.colors['D'], self.colors['T'], self.colors['F'], self.colors['B']
+        self._colors = _Z_ROTATION(self._colors)
         return self
 
     def reverse_x_rotation(self):
-        self.colors['F'], self.colors['B'], self.colors['R'], self.colors['L'] = \
-        self.colors['R'], self.colors['L'], self.colors['B'], self.colors['F']
+        self._colors = _REVERSE_X_ROTATION(self._colors)
         return self
 
     def reverse_y_rotation(self):
-        self.colors['R'], self.colors['L'], self.colors['T'], self.colors['D'] = \
-        self.colors['D'], self.colors['T'], self.colors['R'], self.colors['L']
+        self._colors = _REVERSE_Y_ROTATION(self._colors)
         return self
 
     def reverse_z_rotation(self):
-        self.colors['F'], self.colors['B'], self.colors['T'], self.colors['D'] = \
-        self.colors['T'], self.colors['D'], self.colors['B'], self.colors['F']
+        self._colors = _REVERSE_Z_ROTATION(self._colors)
         return self
     
     def x_flip(self):
-        self.colors['R'], self.colors['L'] = self.colors['L'], self.colors['R']
+        self._colors = _X_FLIP(self._colors)
         return self
 
     def y_flip(self):
-        self.colors['F'], self.colors['B'] = self.colors['B'], self.colors['F']
+        self._colors = _Y_FLIP(self._colors)
         return self
     
     def z_flip(self):
-        self.colors['T'], self.colors['D'] = self.colors['D'], self.colors['T']
+        self._colors = _Z_FLIP(self._colors)
         return self
@@ -0,0 +1,82 @@
+import numpy as np
+
+from cubeLayout import CORNER_SLOTS, EDGE_SLOTS, FACE_COLORS, SOLVED_STATE
+from cubePieces import color_onehotencoding
+
+NUM_CORNERS = len(CORNER_SLOTS)
+NUM_EDGES = len(EDGE_SLOTS)
+
+# colors of each cubie read in slot order at its solved position
+CORNER_COLORS = SOLVED_STATE[CORNER_SLOTS]
+EDGE_COLORS = SOLVED_STATE[EDGE_SLOTS]
+
+_REFERENCE_COLORS = np.array(
+    [color_onehotencoding[FACE_COLORS[face]] for face in ('T', 'D', 'F', 'B')]
+)
+
+
+def _identity_lookup(colors: np.ndarray) -> np.ndarray:
+    lookup = np.full(1 << 6, -1, dtype=np.int64)
+    for cubie, cubie_colors in enumerate(colors):
+        lookup[np.bitwise_or.reduce(1 << cubie_colors)] = cubie
+    return lookup
+
+
+_CORNER_LOOKUP = _identity_lookup(CORNER_COLORS)
+_EDGE_LOOKUP = _identity_lookup(EDGE_COLORS)
+
+
+def _orientation(stickers: np.ndarray, reference: np.ndarray) -> np.ndarray:
+    return np.argmax(np.isin(stickers, reference), axis=-1)
+
+
+def cubies_from_states(states: np.ndarray):
+    states = np.asarray(states)
+    corners = states[..., CORNER_SLOTS]
+    edges = states[..., EDGE_SLOTS]
+
+    corner_permutation = _CORNER_LOOKUP[np.bitwise_or.reduce(1 << corners.astype(np.int64), axis=-1)]
+    edge_permutation = _EDGE_LOOKUP[np.bitwise_or.reduce(1 << edges.astype(np.int64), axis=-1)]
+    corner_orientation = _orientation(corners, _REFERENCE_COLORS[:2])
+    # the reference sticker of an edge is its T/D color, or its F/B color if it has none
+    has_top = np.isin(EDGE_COLORS[edge_permutation], _REFERENCE_COLORS[:2]).any(axis=-1)
+    edge_orientation = np.where(
+        has_top, _orientation(edges, _REFERENCE_COLORS[:2]), _orientation(edges, _REFERENCE_COLORS[2:])
+    )
+    return corner_permutation, corner_orientation, edge_permutation, edge_orientation
+
+
+def states_from_cubies(corner_permutation, corner_orientation, edge_permutation, edge_orientation) -> np.ndarray:
+    corner_permutation = np.asarray(corner_permutation)
+    batch_shape = corner_permutation.shape[:-1]
+    states = np.broadcast_to(SOLVED_STATE, batch_shape + SOLVED_STATE.shape).copy()
+
+    slot = np.arange(3)
+    twist = np.asarray(corner_orientation)[..., None]
+    states[..., CORNER_SLOTS] = CORNER_COLORS[corner_permutation[..., None], (slot - twist) % 3]
+
+    slot = np.arange(2)
+    flip = np.asarray(edge_orientation)[..., None]
+    states[..., EDGE_SLOTS] = EDGE_COLORS[np.asarray(edge_permutation)[..., None], (slot - flip) % 2]
+    return states
+
+
+def permutation_parity(permutations: np.ndarray) -> np.ndarray:
+    permutations = np.asarray(permutations)
+    inversions = permutations[..., :, None] > permutations[..., None, :]
+    return np.triu(inversions, k=1).sum(axis=(-2, -1)) % 2
+
+
+def is_valid(states: np.ndarray) -> np.ndarray:
+    states = np.asarray(states)
+    cp, co, ep, eo = cubies_from_states(states)
+    # the cubie view only looks at color sets and one reference sticker, so a mirrored corner or a
+    # wrong center reads back fine; rebuilding the stickers from it catches those
+    return (
+        (states_from_cubies(cp, co, ep, eo) == states).all(axis=-1)
+        & (np.sort(cp, axis=-1) == np.arange(NUM_CORNERS)).all(axis=-1)
+        & (np.sort(ep, axis=-1) == np.arange(NUM_EDGES)).all(axis=-1)
+        & (co.sum(axis=-1) % 3 == 0)
+        & (eo.sum(axis=-1) % 2 == 0)
+        & (permutation_parity(cp) == permutation_parity(ep))
+    )
@@ -0,0 +1,283 @@
+import argparse
+import multiprocessing as mp
+import os
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from cubeEnv import CubeEnv
+from cubeLayout import NUM_STICKERS
+from Constants import NUM_CUBES, SAVE_ITERATION, RESET_ITERATION, MOVES
+
+NUM_ACTIONS = len(MOVES)
+
+# one slot holds a whole actor step: a transition for every cube in that actor's batch
+TRANSITION_FIELDS = (
+    ("states", np.uint8, (NUM_STICKERS,)),
+    ("actions", np.int32, ()),
+    ("rewards", np.float32, ()),
+    ("next_states", np.uint8, (NUM_STICKERS,)),
+    ("dones", np.bool_, ()),
+)
+
+
+class SharedArrays:
+    # several fixed-shape arrays packed into one shared memory block; pickles as (name, layout)
+    def __init__(self, layout, name=None):
+        self.layout = layout
+        offsets, size = [], 0
+        for _, dtype, shape in layout:
+            size = -(-size // 8) * 8
+            offsets.append(size)
+            size += int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize
+        self.memory = shared_memory.SharedMemory(name=name, create=name is None, size=max(size, 1))
+        self.arrays = {
+            field: np.ndarray(shape, dtype=dtype, buffer=self.memory.buf, offset=offset)
+            for (field, dtype, shape), offset in zip(layout, offsets)
+        }
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        return self.arrays[field]
+
+    def __reduce__(self):
+        return SharedArrays, (self.layout, self.memory.name)
+
+    def close(self):
+        self.arrays = {}
+        self.memory.close()
+
+    def unlink(self):
+        self.close()
+        self.memory.unlink()
+
+
+def transition_layout(num_slots: int, num_cubes: int):
+    return [(field, dtype, (num_slots, num_cubes) + shape) for field, dtype, shape in TRANSITION_FIELDS]
+
+
+def layer_plan(model) -> list[tuple]:
+    # what an actor needs to replay the Keras model's inference pass with plain NumPy
+    plan = []
+    for layer in model.layers:
+        kind = type(layer).__name__
+        if kind == "OneHotStates":
+            plan.append(("one_hot", layer.num_colors))
+        elif kind == "Dense":
+            plan.append(("dense",))
+        elif kind == "LeakyReLU":
+            plan.append(("leaky_relu", float(layer.alpha)))
+        elif kind == "BatchNormalization":
+            plan.append(("batch_norm", float(layer.epsilon)))
+        elif kind != "Dropout":
+            raise ValueError(f"actors cannot run a {kind} layer")
+    return plan
+
+
+def numpy_forward(plan, weights, x: np.ndarray) -> np.ndarray:
+    weights = iter(weights)
+    for step in plan:
+        if step[0] == "one_hot":
+            x = np.eye(step[1], dtype=np.float32)[x].reshape(len(x), -1)
+        elif step[0] == "dense":
+            kernel, bias = next(weights), next(weights)
+            x = x @ kernel + bias
+        elif step[0] == "leaky_relu":
+            x = np.where(x > 0, x, step[1] * x)
+        else:
+            gamma, beta, mean, variance = (next(weights) for _ in range(4))
+            x = (x - mean) * (gamma / np.sqrt(variance + step[1])) + beta
+    return x
+
+
+def actor_loop(
+    actor_id, num_cubes, max_steps, seed, plan,
+    slots, free_slots, full_slots, weights, version, epsilon, stop,
+):
+    env = CubeEnv(num_cubes, max_steps, seed=seed)
+    rng = np.random.default_rng(seed)
+    params, seen = None, -1
+
+    while not stop.is_set():
+        if version.value != seen:
+            with version.get_lock():
+                params = [weights[f"w{i}"].copy() for i in range(len(weights.layout))]
+                seen = version.value
+
+        try:
+            slot = free_slots.get(timeout=0.1)
+        except queue.Empty:
+            continue
+
+        states = env.states
+        q_values = numpy_forward(plan, params, states)
+        explore = rng.random(num_cubes) < epsilon.value
+        actions = np.where(explore, rng.integers(0, NUM_ACTIONS, num_cubes), q_values.argmax(axis=1))
+        next_states, rewards, dones = env.step(actions)
+
+        slots["states"][slot] = states
+        slots["actions"][slot] = actions
+        slots["rewards"][slot] = rewards
+        slots["next_states"][slot] = next_states
+        slots["dones"][slot] = dones
+        full_slots.put((actor_id, slot, int(env.solved.sum()), env.episode_rewards[dones].tolist()))
+        env.reset(dones)
+
+    slots.close()
+    weights.close()
+    full_slots.cancel_join_thread()
+
+
+def _broadcast(agent, weights, version):
+    with version.get_lock():
+        for i, w in enumerate(agent.model.get_weights()):
+            weights[f"w{i}"][...] = w
+        version.value += 1
+
+
+def _check_actors(actors):
+    # actors only return once stop is set, so any exit before that loses its slots for good
+    exited = [(actor_id, process.exitcode) for actor_id, (process, _, _) in enumerate(actors) if not process.is_alive()]
+    if exited:
+        details = ", ".join(f"actor {actor_id} (exit code {code})" for actor_id, code in exited)
+        raise RuntimeError(f"{details} stopped unexpectedly")
+
+
+def _next_slot(full_slots, actors, timeout: float):
+    while True:
+        try:
+            return full_slots.get(timeout=timeout)
+        except queue.Empty:
+            _check_actors(actors)
+
+
+def train_distributed(
+    num_actors: int = max((os.cpu_count() or 2) - 1, 1),
+    cubes_per_actor: int = NUM_CUBES,
+    num_iterations: int = 100_000,
+    max_steps: int = 1000,
+    batch_size: int = 128,
+    train_steps_per_iteration: int = 10,
+    target_update_every: int = 10,
+    broadcast_every: int = 10,
+    slots_per_actor: int = 4,
+    epsilon_start: float = 1.0,
+    epsilon_end: float = 0.05,
+    epsilon_decay: float = 0.999,
+    prioritized: bool = False,
+    seed=None,
+    actor_timeout: float = 1.0,
+):
+    from dqnAgent import DQNAgent
+
+    agent = DQNAgent(state_size=NUM_STICKERS, prioritized=prioritized)
+    plan = layer_plan(agent.model)
+
+    ctx = mp.get_context("spawn")
+    stop = ctx.Event()
+    version = ctx.Value("q", 0)
+    epsilon = ctx.Value("d", epsilon_start, lock=False)
+    weights = SharedArrays([(f"w{i}", np.float32, w.shape) for i, w in enumerate(agent.model.get_weights())])
+    _broadcast(agent, weights, version)
+
+    full_slots = ctx.Queue()
+    actors = []
+    seeds = np.random.SeedSequence(seed).spawn(num_actors)
+    for actor_id in range(num_actors):
+        slots = SharedArrays(transition_layout(slots_per_actor, cubes_per_actor))
+        free_slots = ctx.Queue()
+        for slot in range(slots_per_actor):
+            free_slots.put(slot)
+        process = ctx.Process(
+            target=actor_loop,
+            args=(
+                actor_id, cubes_per_actor, max_steps, seeds[actor_id], plan,
+                slots, free_slots, full_slots, weights, version, epsilon, stop,
+            ),
+            daemon=True,
+        )
+        process.start()
+        actors.append((process, slots, free_slots))
+
+    transitions = 0
+    env_steps = 0
+    start = time.perf_counter()
+    try:
+        for iteration in range(num_iterations):
+            # block for one actor step, then take whatever else is already waiting
+            _check_actors(actors)
+            ready = [_next_slot(full_slots, actors, actor_timeout)]
+            while True:
+                try:
+                    ready.append(full_slots.get_nowait())
+                except queue.Empty:
+                    break
+
+            for actor_id, slot, solved, episode_rewards in ready:
+                _, slots, free_slots = actors[actor_id]
+                agent.remember_batch(
+                    slots["states"][slot], slots["actions"][slot], slots["rewards"][slot],
+                    slots["next_states"][slot], slots["dones"][slot],
+                )
+                free_slots.put(slot)
+                transitions += cubes_per_actor
+
+                for _ in range(solved):
+                    print("=" * 25 + "Cube solved!" + "=" * 25)
+                for reward in episode_rewards:
+                    print(f"[actor {actor_id}] episode reward={reward:.2f} epsilon={epsilon.value:.3f}")
+
+            # Trainer decays once per batched env step, so follow the same schedule in env steps consumed,
+            # however many actors produced them and however many slots this iteration drained
+            env_steps += len(ready)
+            epsilon.value = max(epsilon_end, epsilon_start * epsilon_decay ** env_steps)
+
+            agent.replay_many(train_steps_per_iteration, batch_size)
+
+            if iteration % broadcast_every == 0:
+                _broadcast(agent, weights, version)
+
+            if iteration % target_update_every == 0:
+                agent.update_target()
+
+            if iteration % SAVE_ITERATION == 0:
+                agent.save()
+                rate = transitions / (time.perf_counter() - start)
+                print(f"Iteration {iteration} complete (epsilon={epsilon.value:.3f}, {rate:.0f} transitions/s)")
+
+            if iteration % RESET_ITERATION == 0:
+                agent.reset_gamma()
+    finally:
+        stop.set()
+        for process, _, _ in actors:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        for _, slots, _ in actors:
+            slots.unlink()
+        weights.unlink()
+
+    return agent
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the DQN agent with parallel actor processes")
+    parser.add_argument("--actors", type=int, default=max((os.cpu_count() or 2) - 1, 1))
+    parser.add_argument("--cubes-per-actor", type=int, default=NUM_CUBES)
+    parser.add_argument("--iterations", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--broadcast-every", type=int, default=10)
+    parser.add_argument("--prioritized", action="store_true")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    train_distributed(
+        num_actors=args.actors,
+        cubes_per_actor=args.cubes_per_actor,
+        num_iterations=args.iterations,
+        batch_size=args.batch_size,
+        broadcast_every=args.broadcast_every,
+        prioritized=args.prioritized,
+        seed=args.seed,
+    )
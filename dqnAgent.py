@@ -0,0 +1,168 @@
+import os
+
+import numpy as np
+import tensorflow as tf
+import keras
+
+from modelLayers import OneHotStates, load_weights
+from replayBuffer import PrioritizedReplayBuffer, ReplayBuffer
+from Constants import MOVES
+
+os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"
+
+NUM_ACTIONS = len(MOVES)
+
+
+class DQNAgent:
+    def __init__(
+        self,
+        state_size: int,
+        num_actions: int = NUM_ACTIONS,
+        gamma: float = 0.95,
+        learning_rate: float = 1e-3,
+        buffer_size: int = 100_000,
+        model_path: str = "models/checkpoint.keras",
+        prioritized: bool = False,
+        priority_alpha: float = 0.6,
+        priority_beta: float = 0.4,
+        jit_compile: bool = False,
+        mixed_precision: bool = False,
+        replay_path: str | None = None,
+    ):
+        self.state_size = state_size
+        self.num_actions = num_actions
+        self.gamma = gamma
+        self.learning_rate = learning_rate
+        self.prioritized = prioritized
+        self.replay_buffer: ReplayBuffer
+        if prioritized:
+            self.replay_buffer = PrioritizedReplayBuffer(
+                buffer_size, state_size, alpha=priority_alpha, beta=priority_beta,
+                state_dtype=np.uint8, path=replay_path,
+            )
+        else:
+            self.replay_buffer = ReplayBuffer(buffer_size, state_size, state_dtype=np.uint8, path=replay_path)
+        self.model_path = model_path
+        os.makedirs(os.path.dirname(model_path) or ".", exist_ok=True)
+
+        # bfloat16 is the half type CPUs run natively; the output layer stays float32 for the TD targets
+        self.jit_compile = jit_compile
+        self.dtype_policy = keras.mixed_precision.Policy("mixed_bfloat16" if mixed_precision else "float32")
+        self._train_step = tf.function(self._gradient_step, jit_compile=jit_compile)
+        self._train_steps = tf.function(self._fused_steps, jit_compile=jit_compile)
+        self._greedy_actions = tf.function(self._greedy, jit_compile=jit_compile)
+
+        self.model = self._build_model()
+        self.target_model = self._build_model()
+        self.load()
+        self.update_target()
+        self.model.summary()
+
+    def _build_model(self) -> keras.Sequential:
+        model = keras.Sequential([
+            keras.layers.Input(shape=(self.state_size,), dtype="uint8"),
+            OneHotStates(dtype=self.dtype_policy),
+        ])
+        for _ in range(4):
+            model.add(keras.layers.Dense(128, dtype=self.dtype_policy))
+            model.add(keras.layers.LeakyReLU(alpha=0.01, dtype=self.dtype_policy))
+            model.add(keras.layers.BatchNormalization(dtype=self.dtype_policy))
+            model.add(keras.layers.Dropout(0.2, dtype=self.dtype_policy))
+        model.add(keras.layers.Dense(self.num_actions, dtype="float32"))
+        model.compile(optimizer=keras.optimizers.Adam(self.learning_rate), loss="mse")
+        return model
+
+    def update_target(self):
+        self.target_model.set_weights(self.model.get_weights())
+
+    def remember(self, state, action, reward, next_state, done):
+        self.replay_buffer.add(state, action, reward, next_state, done)
+
+    def remember_batch(self, states, actions, rewards, next_states, dones):
+        self.replay_buffer.add_batch(states, actions, rewards, next_states, dones)
+
+    def act_batch(self, states: np.ndarray, epsilon: float) -> np.ndarray:
+        greedy_actions = self._greedy_actions(states).numpy()
+        random_actions = np.random.randint(0, self.num_actions, size=len(states))
+        explore_mask = np.random.rand(len(states)) < epsilon
+        return np.where(explore_mask, random_actions, greedy_actions)
+
+    def replay(self, batch_size: int = 64):
+        if len(self.replay_buffer) < batch_size:
+            return None
+
+        indices = self.replay_buffer.sample_indices(batch_size)
+        states, actions, rewards, next_states, dones = self.replay_buffer.gather(indices)
+        if isinstance(self.replay_buffer, PrioritizedReplayBuffer):
+            weights = self.replay_buffer.weights(indices)
+        else:
+            weights = np.ones(batch_size, dtype=np.float32)
+
+        loss, td_errors = self._train_step(states, actions, rewards, next_states, dones, weights)
+        if isinstance(self.replay_buffer, PrioritizedReplayBuffer):
+            self.replay_buffer.update_priorities(indices, td_errors.numpy())
+        return loss
+
+    def replay_many(self, num_steps: int, batch_size: int = 64):
+        if len(self.replay_buffer) < batch_size:
+            return None
+
+        # one gather for all num_steps minibatches, then a single graph call runs every gradient step
+        indices = self.replay_buffer.sample_indices(num_steps * batch_size)
+        batches = self.replay_buffer.gather(indices)
+        states, actions, rewards, next_states, dones = (
+            a.reshape((num_steps, batch_size) + a.shape[1:]) for a in batches
+        )
+        if isinstance(self.replay_buffer, PrioritizedReplayBuffer):
+            weights = self.replay_buffer.weights(indices).reshape(num_steps, batch_size)
+        else:
+            weights = np.ones((num_steps, batch_size), dtype=np.float32)
+
+        losses, td_errors = self._train_steps(states, actions, rewards, next_states, dones, weights)
+        if isinstance(self.replay_buffer, PrioritizedReplayBuffer):
+            self.replay_buffer.update_priorities(indices, td_errors.numpy().ravel())
+        return losses
+
+    def _greedy(self, states):
+        return tf.argmax(self.model(states, training=False), axis=1)
+
+    def _fused_steps(self, states, actions, rewards, next_states, dones, weights):
+        num_steps = tf.shape(states)[0]
+        losses = tf.TensorArray(tf.float32, size=num_steps)
+        td_errors = tf.TensorArray(tf.float32, size=num_steps)
+        for k in tf.range(num_steps):
+            loss, td_error = self._gradient_step(
+                states[k], actions[k], rewards[k], next_states[k], dones[k], weights[k]
+            )
+            losses = losses.write(k, loss)
+            td_errors = td_errors.write(k, td_error)
+        return losses.stack(), td_errors.stack()
+
+    def _gradient_step(self, states, actions, rewards, next_states, dones, weights):
+        next_q = self.target_model(next_states, training=False)
+        max_next_q = tf.reduce_max(next_q, axis=1)
+        targets = rewards + (1.0 - dones) * self.gamma * max_next_q
+
+        action_masks = tf.one_hot(actions, self.num_actions)
+        with tf.GradientTape() as tape:
+            q_values = self.model(states, training=True)
+            selected_q = tf.reduce_sum(q_values * action_masks, axis=1)
+            td_errors = targets - selected_q
+            loss = tf.reduce_mean(weights * tf.square(td_errors))
+
+        grads = tape.gradient(loss, self.model.trainable_variables)
+        self.model.optimizer.apply_gradients(zip(grads, self.model.trainable_variables))
+        return loss, td_errors
+
+    def reset_gamma(self):
+        self.gamma = 0
+
+    def save(self):
+        self.model.save(self.model_path)
+
+    def load(self, input_path=None):
+        path = input_path if input_path else self.model_path
+        if os.path.exists(path):
+            load_weights(self.model, path)
+        else:
+            print("No model to load")
@@ -0,0 +1,118 @@
+from cube import Cube
+from cubeLayout import SOLVED_STATE
+from stateEncoding import encode_state
+from moveSequence import compile_getter
+from scrambler import MOVE_GETTERS, scramble_state
+from Constants import MOVES
+
+SOLVED = tuple(SOLVED_STATE.tolist())
+_U, _Ud, _R, _Rd, _F, _Fd, _D, _Dd, _L, _Ld, _B, _Bd = MOVE_GETTERS
+
+
+class FastCube:
+    def __init__(self, state=None):
+        self._state: tuple[int, ...] = SOLVED if state is None else tuple(int(s) for s in state)
+        self._history: list[tuple[str, tuple[int, ...]]] = []
+
+    def __repr__(self):
+        return f"FastCube({list(self._state)})"
+
+    def __eq__(self, other):
+        if not isinstance(other, FastCube):
+            return NotImplemented
+        return self._state == other._state
+
+    def __hash__(self):
+        return hash(self._state)
+
+    def encode(self) -> bytes:
+        return encode_state(self._state)
+
+    @classmethod
+    def from_cube(cls, cube: Cube) -> "FastCube":
+        return cls(cube.get_state())
+
+    def to_cube(self) -> Cube:
+        cube = Cube()
+        cube.set_state(self._state)
+        return cube
+
+    def copy(self) -> "FastCube":
+        cube = FastCube.__new__(FastCube)
+        cube._state = self._state
+        cube._history = self._history.copy()
+        return cube
+
+    def push(self, move: str):
+        self._history.append((move, self._state))
+        getattr(self, move)()
+
+    def pop(self) -> str:
+        move, self._state = self._history.pop()
+        return move
+
+    @property
+    def history(self) -> list[str]:
+        return [move for move, _ in self._history]
+
+    def get_state(self):
+        return list(self._state)
+
+    def is_solved(self):
+        return self._state == SOLVED
+
+    def make_solved_cube(self):
+        self._state = SOLVED
+        self._history.clear()
+
+    def apply_move(self, action: int):
+        self._state = MOVE_GETTERS[action](self._state)
+
+    def apply_sequence(self, sequence):
+        self._state = compile_getter(sequence)(self._state)
+        self._history.clear()
+
+    def U(self):
+        self._state = _U(self._state)
+
+    def Ud(self):
+        self._state = _Ud(self._state)
+
+    def D(self):
+        self._state = _D(self._state)
+
+    def Dd(self):
+        self._state = _Dd(self._state)
+
+    def R(self):
+        self._state = _R(self._state)
+
+    def Rd(self):
+        self._state = _Rd(self._state)
+
+    def L(self):
+        self._state = _L(self._state)
+
+    def Ld(self):
+        self._state = _Ld(self._state)
+
+    def F(self):
+        self._state = _F(self._state)
+
+    def Fd(self):
+        self._state = _Fd(self._state)
+
+    def B(self):
+        self._state = _B(self._state)
+
+    def Bd(self):
+        self._state = _Bd(self._state)
+
+    @property
+    def moves(self):
+        # in action order, so apply_move(i) turns moves[i]
+        return list(MOVES)
+
+    def scramble(self, depth: int = 25, seed=None):
+        self._state = scramble_state(depth, seed)
+        self._history.clear()
@@ -0,0 +1,91 @@
+import argparse
+import os
+
+import numpy as np
+import tensorflow as tf
+import keras
+
+from cubeLayout import NUM_STICKERS
+
+os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"
+
+def state_signature(model) -> tf.TensorSpec:
+    # uint8 for models that one-hot their input in-graph, float32 for older checkpoints
+    return tf.TensorSpec(shape=(None, NUM_STICKERS), dtype=model.inputs[0].dtype, name="states")
+
+
+class InferenceEngine:
+    # one traced call per batch of cubes, whatever the batch size
+    def __init__(self, predict, input_dtype=np.uint8):
+        self._predict = predict
+        self.input_dtype = np.dtype(input_dtype)
+
+    @classmethod
+    def from_model(cls, model) -> "InferenceEngine":
+        signature = state_signature(model)
+        predict = tf.function(lambda states: model(states, training=False), input_signature=[signature])
+        return cls(lambda states: predict(states).numpy(), signature.dtype.as_numpy_dtype)
+
+    @classmethod
+    def load(cls, path: str) -> "InferenceEngine":
+        if path.endswith(".tflite"):
+            predictor = _TFLitePredictor(path)
+            return cls(predictor, predictor.input_dtype)
+        if os.path.isdir(path):
+            signature = tf.saved_model.load(path).signatures["serving_default"]
+            input_dtype = signature.structured_input_signature[1]["states"].dtype.as_numpy_dtype
+            return cls(lambda states: next(iter(signature(states=tf.constant(states)).values())).numpy(), input_dtype)
+        return cls.from_model(keras.models.load_model(path))
+
+    def q_values(self, states: np.ndarray) -> np.ndarray:
+        return self._predict(np.asarray(states, dtype=self.input_dtype))
+
+    def act(self, states: np.ndarray) -> np.ndarray:
+        return np.argmax(self.q_values(states), axis=1)
+
+
+class _TFLitePredictor:
+    def __init__(self, path: str):
+        self.interpreter = tf.lite.Interpreter(model_path=path)
+        details = self.interpreter.get_input_details()[0]
+        self.input = details["index"]
+        self.input_dtype = details["dtype"]
+        self.output = self.interpreter.get_output_details()[0]["index"]
+        self.batch_size: int | None = None
+
+    def __call__(self, states: np.ndarray) -> np.ndarray:
+        # the interpreter is resized only when the batch size changes
+        if len(states) != self.batch_size:
+            self.interpreter.resize_tensor_input(self.input, states.shape)
+            self.interpreter.allocate_tensors()
+            self.batch_size = len(states)
+        self.interpreter.set_tensor(self.input, states)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.output)
+
+
+def export_model(model, path: str, export_format: str = "saved_model"):
+    predict = tf.function(lambda states: model(states, training=False), input_signature=[state_signature(model)])
+    concrete = predict.get_concrete_function()
+    if export_format == "saved_model":
+        module = tf.Module()
+        module.model = model
+        tf.saved_model.save(module, path, signatures={"serving_default": concrete})
+    elif export_format == "tflite":
+        converter = tf.lite.TFLiteConverter.from_concrete_functions([concrete], model)
+        with open(path, "wb") as f:
+            f.write(converter.convert())
+    else:
+        raise ValueError(f"unknown export format {export_format}")
+    print(f"exported {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a Keras checkpoint for fast inference")
+    parser.add_argument("model", nargs="?", default="models/checkpoint.keras")
+    parser.add_argument("--format", choices=["saved_model", "tflite"], default="saved_model")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.model)[0] + (".tflite" if args.format == "tflite" else "")
+    export_model(keras.models.load_model(args.model), output, args.format)
@@ -0,0 +1,49 @@
+import numpy as np
+import tensorflow as tf
+import keras
+
+from cubePieces import color_onehotencoding
+
+NUM_COLORS = len(color_onehotencoding)
+
+
+@keras.utils.register_keras_serializable(package="cube")
+class OneHotStates(keras.layers.Layer):
+    # uint8 color ids in, one float per (sticker, color) out, so states cross to the device at 1 byte per sticker
+    def __init__(self, num_colors: int = NUM_COLORS, **kwargs):
+        super().__init__(**kwargs)
+        self.num_colors = num_colors
+
+    def call(self, states):
+        one_hot = tf.one_hot(tf.cast(states, tf.int32), self.num_colors, dtype=self.compute_dtype)
+        return tf.reshape(one_hot, (-1, states.shape[-1] * self.num_colors))
+
+    def compute_output_shape(self, input_shape):
+        return (input_shape[0], input_shape[-1] * self.num_colors)
+
+    def get_config(self) -> dict:
+        return {**super().get_config(), "num_colors": self.num_colors}
+
+
+def one_hot_kernel(kernel: np.ndarray, num_colors: int = NUM_COLORS) -> np.ndarray:
+    # color ids @ W equals one_hot(color ids) @ W' when row (sticker, color) of W' is color * W[sticker]
+    colors = np.arange(num_colors, dtype=kernel.dtype)
+    return (kernel[:, None, :] * colors[None, :, None]).reshape(-1, kernel.shape[1])
+
+
+def load_weights(model: keras.Model, path: str):
+    # copy a saved model's weights into one that is already built, so it keeps its own input layer,
+    # dtype policy and compiled functions; models saved before OneHotStates took float color ids
+    # and are converted exactly
+    saved = keras.models.load_model(path, compile=False)
+    weights = saved.get_weights()
+    one_hot = [layer for layer in model.layers if isinstance(layer, OneHotStates)]
+    if one_hot and not any(isinstance(layer, OneHotStates) for layer in saved.layers) and weights:
+        weights[0] = one_hot_kernel(weights[0], one_hot[0].num_colors)
+        print(f"Converted {path} from color id inputs to one-hot inputs")
+
+    expected = [w.shape for w in model.get_weights()]
+    found = [w.shape for w in weights]
+    if found != expected:
+        raise ValueError(f"{path} does not fit this model: weight shapes {found}, expected {expected}")
+    model.set_weights(weights)
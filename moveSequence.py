@@ -0,0 +1,54 @@
+from functools import lru_cache
+from operator import itemgetter
+
+import numpy as np
+
+from cubeLayout import INVERSE_MOVES, MOVE_INDEX, MOVE_TABLES, NUM_STICKERS
+from Constants import MOVES
+
+
+def parse_sequence(sequence) -> tuple[int, ...]:
+    moves = sequence.split() if isinstance(sequence, str) else sequence
+    actions = []
+    for move in moves:
+        if isinstance(move, str):
+            if move not in MOVE_INDEX:
+                raise ValueError(f"Unknown move {move!r}, expected one of {MOVES}")
+            actions.append(MOVE_INDEX[move])
+        else:
+            actions.append(int(move))
+    return tuple(actions)
+
+
+def format_sequence(actions) -> str:
+    return " ".join(MOVES[int(action)] for action in actions)
+
+
+def invert_sequence(sequence) -> tuple[int, ...]:
+    return tuple(int(INVERSE_MOVES[action]) for action in reversed(parse_sequence(sequence)))
+
+
+@lru_cache(maxsize=4096)
+def _compile_actions(actions: tuple[int, ...]) -> np.ndarray:
+    table = np.arange(NUM_STICKERS, dtype=np.intp)
+    for action in actions:
+        table = table[MOVE_TABLES[action]]
+    table.flags.writeable = False
+    return table
+
+
+def compile_sequence(sequence) -> np.ndarray:
+    return _compile_actions(parse_sequence(sequence))
+
+
+@lru_cache(maxsize=4096)
+def _compile_getter(actions: tuple[int, ...]) -> itemgetter:
+    return itemgetter(*_compile_actions(actions).tolist())
+
+
+def compile_getter(sequence) -> itemgetter:
+    return _compile_getter(parse_sequence(sequence))
+
+
+def apply_sequence(states: np.ndarray, sequence) -> np.ndarray:
+    return np.asarray(states)[..., compile_sequence(sequence)]
@@ -0,0 +1,180 @@
+import argparse
+import heapq
+import time
+
+import numpy as np
+import keras
+
+from cubeLayout import MOVE_INDEX, MOVE_TABLES, NUM_STICKERS, SOLVED_STATE
+from moveSequence import apply_sequence, format_sequence
+from scrambler import scramble_states
+from solver import SolveResult, as_state
+from stateEncoding import batch_keys, encode_batch
+from Constants import MOVES
+
+MODEL_PATH = "models/checkpoint.keras"
+NUM_MOVES = len(MOVE_TABLES)
+
+
+def network_heuristic(model):
+    # Q-networks (one output per move) score a state by its best move, cost-to-go networks directly
+    outputs = model.output_shape[-1]
+
+    def heuristic(states: np.ndarray) -> np.ndarray:
+        values = model(states, training=False).numpy()
+        if outputs == 1:
+            return np.maximum(values[:, 0], 0.0)
+        return -values.max(axis=1)
+
+    return heuristic
+
+
+class _Nodes:
+    # growable parallel arrays: the search tree is walked back through parent ids at the end
+    def __init__(self, capacity: int = 1 << 14):
+        self.states = np.empty((capacity, NUM_STICKERS), dtype=np.uint8)
+        self.parents = np.empty(capacity, dtype=np.int64)
+        self.moves = np.empty(capacity, dtype=np.int8)
+        self.costs = np.empty(capacity, dtype=np.int32)
+        self.size = 0
+
+    def add(self, states, parents, moves, costs) -> np.ndarray:
+        count = len(states)
+        if self.size + count > len(self.parents):
+            capacity = max(2 * len(self.parents), self.size + count)
+            for name in ("states", "parents", "moves", "costs"):
+                old = getattr(self, name)
+                new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+                new[:self.size] = old[:self.size]
+                setattr(self, name, new)
+        ids = np.arange(self.size, self.size + count)
+        self.states[ids] = states
+        self.parents[ids] = parents
+        self.moves[ids] = moves
+        self.costs[ids] = costs
+        self.size += count
+        return ids
+
+    def path(self, node: int) -> list[str]:
+        moves = []
+        while self.parents[node] >= 0:
+            moves.append(MOVES[self.moves[node]])
+            node = self.parents[node]
+        return moves[::-1]
+
+
+class NetworkSolver:
+    def __init__(self, model=None, model_path: str = MODEL_PATH, heuristic=None):
+        if heuristic is None:
+            model = model if model is not None else keras.models.load_model(model_path)
+            heuristic = network_heuristic(model)
+        self.heuristic = heuristic
+
+    def solve(self, state, batch_size: int = 1000, weight: float = 0.6, beam_width: int | None = None,
+              max_depth: int = 100, max_nodes: int | None = 1_000_000,
+              time_limit: float | None = 10.0) -> SolveResult:
+        # weighted A* popping batch_size nodes per step, or a beam search when beam_width is set
+        state = as_state(state)
+        start = time.perf_counter()
+        deadline = None if time_limit is None else start + time_limit
+        nodes = _Nodes()
+        root = nodes.add(state[None], [-1], [0], [0])
+
+        if (state == SOLVED_STATE).all():
+            return SolveResult([], 1, time.perf_counter() - start)
+        if beam_width is None:
+            goal = self._weighted_astar(nodes, root, batch_size, weight, max_nodes, deadline)
+        else:
+            goal = self._beam_search(nodes, root, beam_width, max_depth, max_nodes, deadline)
+
+        moves = None if goal is None else nodes.path(goal)
+        return SolveResult(moves, nodes.size, time.perf_counter() - start)
+
+    def _expand(self, nodes: _Nodes, parents: np.ndarray, seen: dict):
+        # every child of every parent in one gather; returns the ids of children not seen at a lower cost
+        children = nodes.states[parents][:, MOVE_TABLES].reshape(-1, NUM_STICKERS)
+        child_parents = np.repeat(parents, NUM_MOVES)
+        child_moves = np.tile(np.arange(NUM_MOVES), len(parents))
+        child_costs = nodes.costs[child_parents] + 1
+
+        kept = []
+        for i, key in enumerate(batch_keys(encode_batch(children))):
+            previous = seen.get(key)
+            if previous is None or previous > child_costs[i]:
+                seen[key] = child_costs[i]
+                kept.append(i)
+        keep = np.array(kept, dtype=np.int64)
+        return nodes.add(children[keep], child_parents[keep], child_moves[keep], child_costs[keep])
+
+    def _solved(self, nodes: _Nodes, ids: np.ndarray):
+        solved = ids[(nodes.states[ids] == SOLVED_STATE).all(axis=1)]
+        return int(solved[0]) if len(solved) else None
+
+    def _weighted_astar(self, nodes, root, batch_size, weight, max_nodes, deadline):
+        seen = {batch_keys(encode_batch(nodes.states[root]))[0]: 0}
+        frontier = [(0.0, int(root[0]))]
+        while frontier:
+            if (max_nodes is not None and nodes.size > max_nodes) or (
+                    deadline is not None and time.perf_counter() > deadline):
+                return None
+            parents = np.array([heapq.heappop(frontier)[1] for _ in range(min(batch_size, len(frontier)))])
+            ids = self._expand(nodes, parents, seen)
+            if len(ids) == 0:
+                continue
+            goal = self._solved(nodes, ids)
+            if goal is not None:
+                return goal
+
+            priorities = weight * nodes.costs[ids] + self.heuristic(nodes.states[ids])
+            for priority, node in zip(priorities.tolist(), ids.tolist()):
+                heapq.heappush(frontier, (priority, node))
+        return None
+
+    def _beam_search(self, nodes, root, beam_width, max_depth, max_nodes, deadline):
+        seen = {batch_keys(encode_batch(nodes.states[root]))[0]: 0}
+        beam = root
+        for _ in range(max_depth):
+            if (max_nodes is not None and nodes.size > max_nodes) or (
+                    deadline is not None and time.perf_counter() > deadline):
+                return None
+            ids = self._expand(nodes, beam, seen)
+            if len(ids) == 0:
+                return None
+            goal = self._solved(nodes, ids)
+            if goal is not None:
+                return goal
+
+            estimates = self.heuristic(nodes.states[ids])
+            if len(ids) > beam_width:
+                ids = ids[np.argpartition(estimates, beam_width - 1)[:beam_width]]
+            beam = ids
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solve scrambled cubes with a network-guided batched search")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--cubes", type=int, default=5)
+    parser.add_argument("--depth", type=int, default=25)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--weight", type=float, default=0.6)
+    parser.add_argument("--beam-width", type=int, default=None)
+    parser.add_argument("--max-nodes", type=int, default=1_000_000)
+    parser.add_argument("--time-limit", type=float, default=10.0)
+    args = parser.parse_args()
+
+    solver = NetworkSolver(model_path=args.model)
+    states, _ = scramble_states(args.cubes, args.depth, args.seed)
+    for i, state in enumerate(states):
+        result = solver.solve(
+            state, batch_size=args.batch_size, weight=args.weight, beam_width=args.beam_width,
+            max_nodes=args.max_nodes, time_limit=args.time_limit,
+        )
+        if result.solved:
+            verified = (apply_sequence(state, result.moves) == SOLVED_STATE).all()
+            print(f"cube {i}: {len(result.moves)} moves, verified={verified}, "
+                  f"{result.nodes} nodes ({result.nodes_per_second:.0f} nodes/s)")
+            print(f"  {format_sequence(MOVE_INDEX[m] for m in result.moves)}")
+        else:
+            print(f"cube {i}: no solution within budget, {result.nodes} nodes")
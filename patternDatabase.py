@@ -0,0 +1,229 @@
+import argparse
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from itertools import permutations
+from math import factorial, perm
+
+import numpy as np
+
+from cubeLayout import MOVE_TABLES, SOLVED_STATE
+from cubies import NUM_CORNERS, NUM_EDGES, cubies_from_states
+
+DATABASE_DIR = "pattern_databases"
+UNVISITED = 0xF
+NUM_MOVES = len(MOVE_TABLES)
+
+
+def permutation_rank(permutations: np.ndarray, n: int) -> np.ndarray:
+    # lexicographic rank of full or partial permutations of range(n)
+    permutations = np.asarray(permutations, dtype=np.int64)
+    k = permutations.shape[-1]
+    rank = np.zeros(permutations.shape[:-1], dtype=np.int64)
+    for i in range(k):
+        used_smaller = (permutations[..., :i] < permutations[..., i:i + 1]).sum(axis=-1)
+        rank += (permutations[..., i] - used_smaller) * perm(n - 1 - i, k - 1 - i)
+    return rank
+
+
+def orientation_code(orientations: np.ndarray, base: int) -> np.ndarray:
+    # the last piece is fixed by the others, so it is left out of the code
+    orientations = np.asarray(orientations, dtype=np.int64)[..., :-1]
+    weights = base ** np.arange(orientations.shape[-1] - 1, -1, -1, dtype=np.int64)
+    return orientations @ weights
+
+
+# cubie view of each move: position p receives the piece from source[move, p], twisted by twist[move, p]
+CORNER_SOURCES, CORNER_TWISTS, EDGE_SOURCES, EDGE_FLIPS = cubies_from_states(SOLVED_STATE[MOVE_TABLES])
+
+
+class PatternDatabase(ABC):
+    name: str
+    size: int
+
+    def __init__(self, directory: str = DATABASE_DIR):
+        self.directory = directory
+        self._table: np.memmap | None = None
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, f"{self.name}.pdb")
+
+    @property
+    def goal(self) -> int:
+        return int(self.index(SOLVED_STATE[None])[0])
+
+    @abstractmethod
+    def index(self, states: np.ndarray) -> np.ndarray:
+        ...
+
+    @abstractmethod
+    def neighbors(self, indices: np.ndarray) -> np.ndarray:
+        ...
+
+    def _open_table(self) -> np.memmap:
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"{self.path} does not exist, generate it first")
+        return np.memmap(self.path, dtype=np.uint8, mode="r", shape=((self.size + 1) // 2,))
+
+    def load(self) -> "PatternDatabase":
+        self._table = self._open_table()
+        return self
+
+    def lookup_indices(self, indices: np.ndarray) -> np.ndarray:
+        if self._table is None:
+            self._table = self._open_table()
+        indices = np.asarray(indices, dtype=np.int64)
+        return (self._table[indices >> 1] >> ((indices & 1) << 2)) & 0xF
+
+    def lookup(self, states: np.ndarray) -> np.ndarray:
+        return self.lookup_indices(self.index(np.atleast_2d(states)))
+
+    def generate(self, chunk_size: int = 1 << 20):
+        os.makedirs(self.directory, exist_ok=True)
+        work_path = os.path.join(self.directory, f"{self.name}.work")
+        progress_path = os.path.join(self.directory, f"{self.name}.progress.json")
+
+        if os.path.exists(work_path) and os.path.exists(progress_path):
+            with open(progress_path) as f:
+                depth = json.load(f)["depth"]
+            table = np.fromfile(work_path, dtype=np.uint8)
+            print(f"[{self.name}] resuming after depth {depth}")
+        else:
+            depth = 0
+            table = np.full(self.size, UNVISITED, dtype=np.uint8)
+            table[self.goal] = 0
+
+        visited = int((table != UNVISITED).sum())
+        while True:
+            start = time.perf_counter()
+            frontier = np.flatnonzero(table == depth)
+            if len(frontier) == 0:
+                break
+
+            found = 0
+            for begin in range(0, len(frontier), chunk_size):
+                children = self.neighbors(frontier[begin:begin + chunk_size]).ravel()
+                children = np.unique(children[table[children] == UNVISITED])
+                if len(children) and depth + 1 >= UNVISITED:
+                    raise ValueError(f"{self.name} needs more than 4 bits per entry")
+                table[children] = depth + 1
+                found += len(children)
+            if found == 0:
+                break
+            visited += found
+            depth += 1
+
+            table.tofile(work_path + ".tmp")
+            os.replace(work_path + ".tmp", work_path)
+            with open(progress_path, "w") as f:
+                json.dump({"depth": depth}, f)
+            print(
+                f"[{self.name}] depth {depth}: {found} new states, "
+                f"{visited}/{self.size} visited ({time.perf_counter() - start:.1f}s)"
+            )
+
+        padded = np.append(table, UNVISITED) if self.size % 2 else table
+        packed = padded[0::2] | (padded[1::2] << 4)
+        packed.tofile(self.path)
+        os.remove(work_path)
+        os.remove(progress_path)
+        self._table = None
+        print(f"[{self.name}] wrote {self.path} (max depth {depth})")
+
+
+class CornerDatabase(PatternDatabase):
+    name = "corners"
+    size = factorial(NUM_CORNERS) * 3 ** (NUM_CORNERS - 1)
+    ORIENTATIONS = 3 ** (NUM_CORNERS - 1)
+
+    def __init__(self, directory: str = DATABASE_DIR):
+        super().__init__(directory)
+        self._permutation_moves, self._orientation_moves = self._build_move_tables()
+
+    def _build_move_tables(self):
+        all_permutations = np.array(list(permutations(range(NUM_CORNERS))))
+        codes = np.arange(self.ORIENTATIONS)
+        digits = (codes[:, None] // 3 ** np.arange(NUM_CORNERS - 2, -1, -1)) % 3
+        all_orientations = np.hstack([digits, (-digits.sum(axis=1) % 3)[:, None]])
+
+        permutation_moves = np.empty((len(all_permutations), NUM_MOVES), dtype=np.int32)
+        orientation_moves = np.empty((self.ORIENTATIONS, NUM_MOVES), dtype=np.int32)
+        for move, (source, twist) in enumerate(zip(CORNER_SOURCES, CORNER_TWISTS)):
+            permutation_moves[:, move] = permutation_rank(all_permutations[:, source], NUM_CORNERS)
+            orientation_moves[:, move] = orientation_code((all_orientations[:, source] + twist) % 3, 3)
+        return permutation_moves, orientation_moves
+
+    def index(self, states: np.ndarray) -> np.ndarray:
+        cp, co, _, _ = cubies_from_states(states)
+        return permutation_rank(cp, NUM_CORNERS) * self.ORIENTATIONS + orientation_code(co, 3)
+
+    def neighbors(self, indices: np.ndarray) -> np.ndarray:
+        indices = np.asarray(indices, dtype=np.int64)
+        permutation = self._permutation_moves[indices // self.ORIENTATIONS]
+        orientation = self._orientation_moves[indices % self.ORIENTATIONS]
+        return permutation.astype(np.int64) * self.ORIENTATIONS + orientation
+
+
+class EdgeDatabase(PatternDatabase):
+    def __init__(self, edges=tuple(range(6)), directory: str = DATABASE_DIR):
+        super().__init__(directory)
+        self.edges = np.array(edges)
+        self.others = np.setdiff1d(np.arange(NUM_EDGES), self.edges)
+        self.name = "edges_" + "_".join(str(e) for e in edges)
+        self.flip_states = 1 << len(edges)
+        self.size = perm(NUM_EDGES, len(edges)) * self.flip_states
+        self._position_moves, self._flip_moves = self._build_move_tables()
+
+    def _build_move_tables(self):
+        all_positions = np.array(list(permutations(range(NUM_EDGES), len(self.edges))))
+        bits = 1 << np.arange(len(self.edges))
+
+        position_moves = np.empty((len(all_positions), NUM_MOVES), dtype=np.int32)
+        flip_moves = np.empty((len(all_positions), NUM_MOVES), dtype=np.uint8)
+        for move, (source, flip) in enumerate(zip(EDGE_SOURCES, EDGE_FLIPS)):
+            positions = np.argsort(source)[all_positions]
+            position_moves[:, move] = permutation_rank(positions, NUM_EDGES)
+            flip_moves[:, move] = flip[positions] @ bits
+        return position_moves, flip_moves
+
+    def index(self, states: np.ndarray) -> np.ndarray:
+        _, _, ep, eo = cubies_from_states(states)
+        positions = np.argsort(ep, axis=-1)[..., self.edges]
+        flips = np.take_along_axis(eo, positions, axis=-1) @ (1 << np.arange(len(self.edges)))
+        return permutation_rank(positions, NUM_EDGES) * self.flip_states + flips
+
+    def neighbors(self, indices: np.ndarray) -> np.ndarray:
+        indices = np.asarray(indices, dtype=np.int64)
+        position = self._position_moves[indices // self.flip_states]
+        flips = self._flip_moves[indices // self.flip_states] ^ (indices % self.flip_states)[:, None]
+        return position.astype(np.int64) * self.flip_states + flips
+
+
+def default_databases(directory: str = DATABASE_DIR) -> list[PatternDatabase]:
+    return [
+        CornerDatabase(directory),
+        EdgeDatabase(tuple(range(0, 6)), directory),
+        EdgeDatabase(tuple(range(6, 12)), directory),
+    ]
+
+
+def heuristic(states: np.ndarray, databases: list[PatternDatabase]) -> np.ndarray:
+    return np.max([database.lookup(states) for database in databases], axis=0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate corner and edge pattern databases")
+    parser.add_argument("--directory", default=DATABASE_DIR)
+    parser.add_argument("--only", choices=["corners", "edges_0_1_2_3_4_5", "edges_6_7_8_9_10_11"])
+    parser.add_argument("--chunk-size", type=int, default=1 << 20)
+    args = parser.parse_args()
+
+    for database in default_databases(args.directory):
+        if args.only and database.name != args.only:
+            continue
+        if os.path.exists(database.path):
+            print(f"[{database.name}] {database.path} already exists")
+            continue
+        database.generate(args.chunk_size)
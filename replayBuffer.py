@@ -0,0 +1,226 @@
+import os
+
+import numpy as np
+
+
+def _array(directory: str | None, name: str, shape: tuple, dtype) -> tuple[np.ndarray, bool]:
+    # in memory, or a .npy memmap under directory that is reopened as-is when its shape still matches;
+    # the flag says whether earlier contents survived
+    if directory is None:
+        return np.zeros(shape, dtype=dtype), False
+    path = os.path.join(directory, f"{name}.npy")
+    if os.path.exists(path):
+        array = np.load(path, mmap_mode="r+")
+        if array.shape == shape and array.dtype == dtype:
+            return array, True
+        del array
+    os.makedirs(directory, exist_ok=True)
+    return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape), False
+
+
+class ReplayBuffer:
+    def __init__(self, capacity: int, state_size: int, state_dtype=np.float32, seed=None, path: str | None = None):
+        self.capacity = capacity
+        self.state_size = state_size
+        self.rng = np.random.default_rng(seed)
+        self.path = path
+        self.reopened = True
+
+        self.states = self._open("states", (capacity, state_size), state_dtype)
+        self.actions = self._open("actions", (capacity,), np.int32)
+        self.rewards = self._open("rewards", (capacity,), np.float32)
+        self.next_states = self._open("next_states", (capacity, state_size), state_dtype)
+        self.dones = self._open("dones", (capacity,), np.float32)
+
+        self.position = 0
+        self.size = 0
+
+    def _open(self, name: str, shape: tuple, dtype) -> np.ndarray:
+        array, reopened = _array(self.path, name, shape, np.dtype(dtype))
+        self.reopened &= reopened
+        return array
+
+    def _arrays(self) -> tuple:
+        return self.states, self.actions, self.rewards, self.next_states, self.dones
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add_batch(self, states, actions, rewards, next_states, dones) -> np.ndarray:
+        count = len(actions)
+        if count > self.capacity:
+            # only the newest transitions would survive anyway
+            states, actions, rewards, next_states, dones = (
+                np.asarray(a)[-self.capacity:] for a in (states, actions, rewards, next_states, dones)
+            )
+            count = self.capacity
+
+        indices = (self.position + np.arange(count)) % self.capacity
+        self.states[indices] = states
+        self.actions[indices] = actions
+        self.rewards[indices] = rewards
+        self.next_states[indices] = next_states
+        self.dones[indices] = dones
+
+        self.position = (self.position + count) % self.capacity
+        self.size = min(self.size + count, self.capacity)
+        return indices
+
+    def add(self, state, action, reward, next_state, done) -> np.ndarray:
+        return self.add_batch([state], [action], [reward], [next_state], [done])
+
+    def sample_indices(self, batch_size: int) -> np.ndarray:
+        return self.rng.integers(0, self.size, size=batch_size)
+
+    def gather(self, indices: np.ndarray):
+        return (
+            self.states[indices],
+            self.actions[indices],
+            self.rewards[indices],
+            self.next_states[indices],
+            self.dones[indices],
+        )
+
+    def sample(self, batch_size: int):
+        return self.gather(self.sample_indices(batch_size))
+
+    def flush(self):
+        for array in self._arrays():
+            if isinstance(array, np.memmap):
+                array.flush()
+
+    def _truncate(self, size: int):
+        # rows past size are left over from an abandoned or later run, so clear them
+        for array in self._arrays():
+            array[size:] = 0
+        self.size = size
+
+    def reset(self):
+        self.position = 0
+        self._truncate(0)
+
+    def state_dict(self) -> dict:
+        # the transitions themselves live in the arrays; this is what is needed to reopen them
+        return {"position": int(self.position), "size": int(self.size)}
+
+    def load_state_dict(self, state: dict):
+        position, size = state["position"], state["size"]
+        if not self.reopened:
+            print("Replay memory was not reopened from disk, starting with an empty buffer")
+            self.reset()
+            return
+        if not 0 <= size <= self.capacity or (size < self.capacity and position != size):
+            raise ValueError(f"replay state (position={position}, size={size}) does not fit capacity {self.capacity}")
+        self.position = position
+        self._truncate(size)
+
+
+class SumTree:
+    # array-backed binary tree: node i has children 2i and 2i + 1, leaves start at self.leaves
+    def __init__(self, capacity: int, path: str | None = None):
+        self.capacity = capacity
+        self.leaves = 1 << max(capacity - 1, 1).bit_length()
+        self.nodes, self.reopened = _array(path, "priorities", (2 * self.leaves,), np.dtype(np.float64))
+
+    @property
+    def total(self) -> float:
+        return float(self.nodes[1])
+
+    def __getitem__(self, indices):
+        return self.nodes[self.leaves + np.asarray(indices)]
+
+    def update(self, indices: np.ndarray, priorities: np.ndarray):
+        nodes = self.leaves + np.asarray(indices, dtype=np.int64)
+        self.nodes[nodes] = priorities
+        # walk every touched path up one level at a time, recomputing each parent once
+        nodes = np.unique(nodes >> 1)
+        while True:
+            self.nodes[nodes] = self.nodes[2 * nodes] + self.nodes[2 * nodes + 1]
+            if nodes[0] == 1:
+                break
+            nodes = np.unique(nodes >> 1)
+
+    def rebuild(self, count: int):
+        # keep the first count leaves, clear the rest and recompute every parent level from the leaves up
+        self.nodes[self.leaves + count:] = 0.0
+        level = self.leaves
+        while level > 1:
+            self.nodes[level // 2:level] = self.nodes[level:2 * level:2] + self.nodes[level + 1:2 * level:2]
+            level //= 2
+
+    def find(self, values: np.ndarray) -> np.ndarray:
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        while nodes[0] < self.leaves:
+            left = 2 * nodes
+            go_right = values >= self.nodes[left]
+            values -= np.where(go_right, self.nodes[left], 0.0)
+            nodes = left + go_right
+        return np.minimum(nodes - self.leaves, self.capacity - 1)
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    def __init__(
+        self,
+        capacity: int,
+        state_size: int,
+        alpha: float = 0.6,
+        beta: float = 0.4,
+        beta_increment: float = 1e-5,
+        epsilon: float = 1e-3,
+        state_dtype=np.float32,
+        seed=None,
+        path: str | None = None,
+    ):
+        super().__init__(capacity, state_size, state_dtype, seed, path)
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.epsilon = epsilon
+        self.tree = SumTree(capacity, path)
+        self.reopened &= self.tree.reopened
+        self.max_priority = 1.0
+
+    def add_batch(self, states, actions, rewards, next_states, dones) -> np.ndarray:
+        indices = super().add_batch(states, actions, rewards, next_states, dones)
+        # new transitions get the highest priority seen so far so each is replayed at least once
+        self.tree.update(indices, np.full(len(indices), self.max_priority))
+        return indices
+
+    def sample_indices(self, batch_size: int) -> np.ndarray:
+        # one draw per equal slice of the total priority mass
+        bounds = np.linspace(0.0, self.tree.total, batch_size + 1)
+        values = self.rng.uniform(bounds[:-1], bounds[1:])
+        return np.minimum(self.tree.find(values), self.size - 1)
+
+    def weights(self, indices: np.ndarray) -> np.ndarray:
+        self.beta = min(1.0, self.beta + self.beta_increment)
+        probabilities = self.tree[indices] / self.tree.total
+        weights = (self.size * probabilities) ** -self.beta
+        return (weights / weights.max()).astype(np.float32)
+
+    def update_priorities(self, indices: np.ndarray, td_errors: np.ndarray):
+        priorities = (np.abs(td_errors) + self.epsilon) ** self.alpha
+        self.tree.update(indices, priorities)
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+
+    def flush(self):
+        super().flush()
+        if isinstance(self.tree.nodes, np.memmap):
+            self.tree.nodes.flush()
+
+    def _truncate(self, size: int):
+        super()._truncate(size)
+        self.tree.rebuild(size)
+
+    def reset(self):
+        super().reset()
+        self.max_priority = 1.0
+
+    def state_dict(self) -> dict:
+        return {**super().state_dict(), "beta": self.beta, "max_priority": self.max_priority}
+
+    def load_state_dict(self, state: dict):
+        self.beta = state.get("beta", self.beta)
+        self.max_priority = state.get("max_priority", self.max_priority)
+        super().load_state_dict(state)
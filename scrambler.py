@@ -0,0 +1,89 @@
+import random
+from operator import itemgetter
+
+import numpy as np
+
+from cubeLayout import INVERSE_MOVES, MOVE_TABLES, SOLVED_STATE
+from cubies import NUM_CORNERS, NUM_EDGES, permutation_parity, states_from_cubies
+
+NUM_MOVES = len(MOVE_TABLES)
+MOVE_GETTERS = [itemgetter(*table) for table in MOVE_TABLES.tolist()]
+SOLVED = tuple(SOLVED_STATE.tolist())
+_INVERSE_MOVES = INVERSE_MOVES.tolist()
+_RANDOM = random.Random()
+
+
+def scramble_actions(count: int, depth: int, seed=None) -> np.ndarray:
+    # never undo the previous move and never turn the same face three times in a row,
+    # so every scramble is exactly `depth` moves without trivially cancelling pairs
+    rng = np.random.default_rng(seed)
+    actions = np.empty((count, depth), dtype=np.int64)
+    for step in range(depth):
+        column = rng.integers(0, NUM_MOVES, size=count)
+        while True:
+            invalid = np.zeros(count, dtype=bool)
+            if step >= 1:
+                invalid |= column == INVERSE_MOVES[actions[:, step - 1]]
+            if step >= 2:
+                invalid |= (column == actions[:, step - 1]) & (column == actions[:, step - 2])
+            if not invalid.any():
+                break
+            column[invalid] = rng.integers(0, NUM_MOVES, size=int(invalid.sum()))
+        actions[:, step] = column
+    return actions
+
+
+def scramble_sequence(depth: int = 25, seed=None) -> list[int]:
+    # single-cube version of scramble_actions with the same rules; building numpy batches
+    # and a fresh Generator costs far more than the moves themselves for one cube
+    if seed is None:
+        rng = _RANDOM
+    elif isinstance(seed, np.random.Generator):
+        rng = random.Random(int(seed.integers(1 << 62)))
+    else:
+        rng = random.Random(seed)
+    actions: list[int] = []
+    for step in range(depth):
+        while True:
+            action = rng.randrange(NUM_MOVES)
+            if step >= 1 and action == _INVERSE_MOVES[actions[-1]]:
+                continue
+            if step >= 2 and action == actions[-1] == actions[-2]:
+                continue
+            break
+        actions.append(action)
+    return actions
+
+
+def scramble_state(depth: int = 25, seed=None) -> tuple[int, ...]:
+    state = SOLVED
+    for action in scramble_sequence(depth, seed):
+        state = MOVE_GETTERS[action](state)
+    return state
+
+
+def apply_actions(states: np.ndarray, actions: np.ndarray) -> np.ndarray:
+    for column in np.asarray(actions).T:
+        states = np.take_along_axis(states, MOVE_TABLES[column], axis=1)
+    return states
+
+
+def scramble_states(count: int, depth: int = 25, seed=None) -> tuple[np.ndarray, np.ndarray]:
+    actions = scramble_actions(count, depth, seed)
+    states = apply_actions(np.tile(SOLVED_STATE, (count, 1)), actions)
+    return states, actions
+
+
+def random_states(count: int, seed=None) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    corner_permutation = rng.permuted(np.tile(np.arange(NUM_CORNERS), (count, 1)), axis=1)
+    edge_permutation = rng.permuted(np.tile(np.arange(NUM_EDGES), (count, 1)), axis=1)
+    mismatched = permutation_parity(corner_permutation) != permutation_parity(edge_permutation)
+    edge_permutation[mismatched, :2] = edge_permutation[mismatched, 1::-1]
+
+    corner_orientation = rng.integers(0, 3, size=(count, NUM_CORNERS))
+    corner_orientation[:, -1] = -corner_orientation[:, :-1].sum(axis=1) % 3
+    edge_orientation = rng.integers(0, 2, size=(count, NUM_EDGES))
+    edge_orientation[:, -1] = edge_orientation[:, :-1].sum(axis=1) % 2
+
+    return states_from_cubies(corner_permutation, corner_orientation, edge_permutation, edge_orientation)
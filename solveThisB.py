@@ -1,57 +1,74 @@
 import numpy as np
-import keras
 import pyglet
 
 from cube import Cube
+from cubeLayout import MOVE_TABLES
+from inferenceEngine import InferenceEngine
+from scrambler import scramble_states
 from AIThisB import MOVES, SOLVED_STATE, CubeWindow
 
 MODEL_PATH = "models/checkpoint.keras"
 
 
 def solve_step(cube, model):
-    state = np.array([cube.get_state()], dtype=np.float32)
+    state = np.array([cube.get_state()], dtype=np.uint8)
     q_values = model(state, training=False).numpy()[0]
     action = int(np.argmax(q_values))
     getattr(cube, MOVES[action])()
     return cube.get_state() == SOLVED_STATE
 
 
-def test(num_cubes=8, max_steps=250, render_indices=None, model_path=MODEL_PATH):
-    model = keras.models.load_model(model_path)
+def test(num_cubes=8, max_steps=250, render_indices=None, model_path=MODEL_PATH, scramble_depth=25, seed=None):
+    # model_path may also be an exported SavedModel directory or .tflite file
+    engine = InferenceEngine.load(model_path)
 
-    cubes = [Cube() for _ in range(num_cubes)]
-    for cube in cubes:
-        cube.scramble()
+    states, _ = scramble_states(num_cubes, scramble_depth, seed)
+    solved_state = np.array(SOLVED_STATE, dtype=np.uint8)
 
     render_indices = set(render_indices or [])
-    windows = [CubeWindow(cubes[i], i) for i in range(num_cubes) if i in render_indices]
+    windows = {i: CubeWindow(Cube(), i) for i in range(num_cubes) if i in render_indices}
+    for i, window in windows.items():
+        window.cube.set_state(states[i])
 
-    step_counts = [0] * num_cubes
-    solved = [False] * num_cubes
-    finished = [False] * num_cubes
+    step_counts = np.zeros(num_cubes, dtype=np.int64)
+    solved = np.zeros(num_cubes, dtype=bool)
+    finished = np.zeros(num_cubes, dtype=bool)
+
+    def report():
+        print(f"Solved {solved.sum()}/{num_cubes} cubes")
+        for i in range(num_cubes):
+            status = "solved" if solved[i] else "unsolved"
+            print(f"  cube {i}: {status} in {step_counts[i]} steps")
 
     def step(dt):
-        if all(finished):
-            print(f"Solved {sum(solved)}/{num_cubes} cubes")
-            for i in range(num_cubes):
-                status = "solved" if solved[i] else "unsolved"
-                print(f"  cube {i}: {status} in {step_counts[i]} steps")
+        # every unfinished cube goes through the network in one batch
+        active = np.flatnonzero(~finished)
+        actions = engine.act(states[active])
+        states[active] = np.take_along_axis(states[active], MOVE_TABLES[actions], axis=1)
+        step_counts[active] += 1
+
+        solved[active] = (states[active] == solved_state).all(axis=1)
+        finished[active] = solved[active] | (step_counts[active] >= max_steps)
+
+        for i, window in windows.items():
+            window.cube.set_state(states[i])
+
+    if not windows:
+        while not finished.all():
+            step(0)
+        report()
+        return solved, step_counts
+
+    def tick(dt):
+        if finished.all():
+            report()
             pyglet.app.exit()
             return
+        step(dt)
 
-        for i, cube in enumerate(cubes):
-            if finished[i]:
-                continue
-            is_solved = solve_step(cube, model)
-            step_counts[i] += 1
-            if is_solved:
-                solved[i] = True
-                finished[i] = True
-            elif step_counts[i] >= max_steps:
-                finished[i] = True
-
-    pyglet.clock.schedule_interval(step, 1 / 60)
+    pyglet.clock.schedule_interval(tick, 1 / 60)
     pyglet.app.run()
+    return solved, step_counts
 
 
 if __name__ == "__main__":
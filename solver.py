@@ -0,0 +1,370 @@
+import argparse
+import time
+from dataclasses import dataclass
+from itertools import combinations, permutations
+from math import comb
+
+import numpy as np
+
+from cubeLayout import EDGE_SLOTS, INVERSE_MOVES, MOVE_INDEX, MOVE_TABLES, SOLVED_STATE, STICKER_SLOTS, piece_position
+from cubies import NUM_CORNERS, NUM_EDGES, cubies_from_states
+from moveSequence import apply_sequence, format_sequence
+from patternDatabase import (
+    CORNER_SOURCES, CORNER_TWISTS, EDGE_FLIPS, EDGE_SOURCES,
+    PatternDatabase, default_databases, orientation_code, permutation_rank,
+)
+from scrambler import scramble_states
+from Constants import MOVES
+
+NUM_MOVES = len(MOVE_TABLES)
+INVERSE = INVERSE_MOVES.tolist()
+
+# the four edges of the middle (y == 0) layer, which phase 1 moves back into that layer
+SLICE_POSITIONS = np.array([
+    p for p, stickers in enumerate(EDGE_SLOTS) if piece_position(*STICKER_SLOTS[stickers[0]][:2])[1] == 0
+])
+OTHER_POSITIONS = np.setdiff1d(np.arange(NUM_EDGES), SLICE_POSITIONS)
+NUM_SLICES = comb(NUM_EDGES, len(SLICE_POSITIONS))
+
+# phase 2 stays inside <U, D, R2, L2, F2, B2>; half turns are replayed as two quarter turns
+PHASE2_MOVES = [("U",), ("Ud",), ("D",), ("Dd",), ("R", "R"), ("L", "L"), ("F", "F"), ("B", "B")]
+PHASE2_INVERSE = [1, 0, 3, 2, 4, 5, 6, 7]
+
+
+@dataclass
+class SolveResult:
+    moves: list[str] | None
+    nodes: int
+    elapsed: float
+
+    @property
+    def solved(self) -> bool:
+        return self.moves is not None
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class SearchBudgetExceeded(Exception):
+    pass
+
+
+class _SolutionFound(Exception):
+    pass
+
+
+def as_state(state) -> np.ndarray:
+    if hasattr(state, "get_state"):
+        state = state.get_state()
+    return np.asarray(state, dtype=np.uint8)
+
+
+def _allowed(move: int, last: int, before_last: int, inverse: list[int]) -> bool:
+    # skip moves that undo the previous one or turn the same face a third time
+    return move != inverse[last] and not (move == last == before_last) if last >= 0 else True
+
+
+def combination_rank(masks: np.ndarray) -> np.ndarray:
+    masks = np.asarray(masks, dtype=bool)
+    chosen_before = np.cumsum(masks, axis=-1)
+    binomials = np.array([[comb(p, k) for k in range(masks.shape[-1] + 1)] for p in range(masks.shape[-1])])
+    positions = np.arange(masks.shape[-1])
+    return np.where(masks, binomials[positions, chosen_before], 0).sum(axis=-1)
+
+
+def distance_table(size: int, goals, neighbors, chunk_size: int = 1 << 20) -> np.ndarray:
+    table = np.full(size, 0xFF, dtype=np.uint8)
+    table[np.asarray(goals)] = 0
+    depth = 0
+    while True:
+        frontier = np.flatnonzero(table == depth)
+        found = 0
+        for begin in range(0, len(frontier), chunk_size):
+            children = neighbors(frontier[begin:begin + chunk_size]).ravel()
+            children = children[table[children] == 0xFF]
+            table[children] = depth + 1
+            found += len(children)
+        if found == 0:
+            return table
+        depth += 1
+
+
+class _Search:
+    def __init__(self, max_nodes: int | None, time_limit: float | None):
+        self.max_nodes = max_nodes
+        self.deadline = None if time_limit is None else time.perf_counter() + time_limit
+        self.nodes = 0
+
+    def visit(self):
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise SearchBudgetExceeded
+        if self.deadline is not None and self.nodes & 1023 == 0 and time.perf_counter() > self.deadline:
+            raise SearchBudgetExceeded
+
+
+class TwoPhaseSolver:
+    def __init__(self):
+        self._build_phase1_tables()
+        self._build_phase2_tables()
+
+    def _build_phase1_tables(self):
+        twists = (np.arange(3 ** (NUM_CORNERS - 1))[:, None] // 3 ** np.arange(NUM_CORNERS - 2, -1, -1)) % 3
+        twists = np.hstack([twists, (-twists.sum(axis=1) % 3)[:, None]])
+        flips = (np.arange(2 ** (NUM_EDGES - 1))[:, None] >> np.arange(NUM_EDGES - 2, -1, -1)) & 1
+        flips = np.hstack([flips, (flips.sum(axis=1) % 2)[:, None]])
+        slices = np.zeros((NUM_SLICES, NUM_EDGES), dtype=bool)
+        for row, positions in enumerate(combinations(range(NUM_EDGES), len(SLICE_POSITIONS))):
+            slices[row, list(positions)] = True
+        slices = slices[np.argsort(combination_rank(slices))]
+
+        twist_moves = np.empty((len(twists), NUM_MOVES), dtype=np.int64)
+        flip_moves = np.empty((len(flips), NUM_MOVES), dtype=np.int64)
+        slice_moves = np.empty((NUM_SLICES, NUM_MOVES), dtype=np.int64)
+        for move in range(NUM_MOVES):
+            twist_moves[:, move] = orientation_code((twists[:, CORNER_SOURCES[move]] + CORNER_TWISTS[move]) % 3, 3)
+            flip_moves[:, move] = orientation_code((flips[:, EDGE_SOURCES[move]] + EDGE_FLIPS[move]) % 2, 2)
+            slice_moves[:, move] = combination_rank(slices[:, EDGE_SOURCES[move]])
+
+        slice_mask = np.zeros(NUM_EDGES, dtype=bool)
+        slice_mask[SLICE_POSITIONS] = True
+        self.slice_goal = int(combination_rank(slice_mask))
+
+        twist_slice = distance_table(
+            len(twists) * NUM_SLICES, [self.slice_goal],
+            lambda i: twist_moves[i // NUM_SLICES] * NUM_SLICES + slice_moves[i % NUM_SLICES],
+        )
+        flip_slice = distance_table(
+            len(flips) * NUM_SLICES, [self.slice_goal],
+            lambda i: flip_moves[i // NUM_SLICES] * NUM_SLICES + slice_moves[i % NUM_SLICES],
+        )
+        self._twist_moves = twist_moves.tolist()
+        self._flip_moves = flip_moves.tolist()
+        self._slice_moves = slice_moves.tolist()
+        self._twist_slice = twist_slice.tobytes()
+        self._flip_slice = flip_slice.tobytes()
+
+    def _build_phase2_tables(self):
+        corner_sources, edge_sources = [], []
+        for sequence in PHASE2_MOVES:
+            corners, edges = np.arange(NUM_CORNERS), np.arange(NUM_EDGES)
+            for move in sequence:
+                corners = corners[CORNER_SOURCES[MOVE_INDEX[move]]]
+                edges = edges[EDGE_SOURCES[MOVE_INDEX[move]]]
+            corner_sources.append(corners)
+            edge_sources.append(edges)
+
+        local = np.empty(NUM_EDGES, dtype=np.int64)
+        local[OTHER_POSITIONS] = np.arange(len(OTHER_POSITIONS))
+        local[SLICE_POSITIONS] = np.arange(len(SLICE_POSITIONS))
+        corner_permutations = np.array(list(permutations(range(NUM_CORNERS))))
+        edge_permutations = np.array(list(permutations(range(len(OTHER_POSITIONS)))))
+        slice_permutations = np.array(list(permutations(range(len(SLICE_POSITIONS)))))
+
+        count = len(PHASE2_MOVES)
+        corner_moves = np.empty((len(corner_permutations), count), dtype=np.int64)
+        edge_moves = np.empty((len(edge_permutations), count), dtype=np.int64)
+        slice_moves = np.empty((len(slice_permutations), count), dtype=np.int64)
+        for move, (corners, edges) in enumerate(zip(corner_sources, edge_sources)):
+            corner_moves[:, move] = permutation_rank(corner_permutations[:, corners], NUM_CORNERS)
+            edge_moves[:, move] = permutation_rank(
+                edge_permutations[:, local[edges[OTHER_POSITIONS]]], len(OTHER_POSITIONS)
+            )
+            slice_moves[:, move] = permutation_rank(
+                slice_permutations[:, local[edges[SLICE_POSITIONS]]], len(SLICE_POSITIONS)
+            )
+
+        slices = len(slice_permutations)
+        corner_slice = distance_table(
+            len(corner_permutations) * slices, [0],
+            lambda i: corner_moves[i // slices] * slices + slice_moves[i % slices],
+        )
+        edge_slice = distance_table(
+            len(edge_permutations) * slices, [0],
+            lambda i: edge_moves[i // slices] * slices + slice_moves[i % slices],
+        )
+        self._local = local
+        self._corner_moves = corner_moves.tolist()
+        self._edge_moves = edge_moves.tolist()
+        self._slice_permutation_moves = slice_moves.tolist()
+        self._corner_slice = corner_slice.tobytes()
+        self._edge_slice = edge_slice.tobytes()
+        self._slice_permutations = slices
+
+    def _phase1_coordinates(self, state: np.ndarray) -> tuple[int, int, int]:
+        _, co, ep, eo = cubies_from_states(state)
+        slice_mask = np.isin(ep, SLICE_POSITIONS)
+        return int(orientation_code(co, 3)), int(orientation_code(eo, 2)), int(combination_rank(slice_mask))
+
+    def _phase2_coordinates(self, state: np.ndarray) -> tuple[int, int, int]:
+        cp, _, ep, _ = cubies_from_states(state)
+        return (
+            int(permutation_rank(cp, NUM_CORNERS)),
+            int(permutation_rank(self._local[ep[OTHER_POSITIONS]], len(OTHER_POSITIONS))),
+            int(permutation_rank(self._local[ep[SLICE_POSITIONS]], len(SLICE_POSITIONS))),
+        )
+
+    def solve(self, state, max_length: int = 40, target_length: int | None = None,
+              time_limit: float | None = 10.0, max_nodes: int | None = None) -> SolveResult:
+        # returns the first solution found unless target_length asks to keep shortening it
+        state = as_state(state)
+        search = _Search(max_nodes, time_limit)
+        start = time.perf_counter()
+        self._best: list[int] | None = None
+        self._best_length = max_length + 1
+        self._target_length = max_length if target_length is None else target_length
+        self._state = state
+
+        twist, flip, slice_ = self._phase1_coordinates(state)
+        try:
+            for depth in range(self._best_length):
+                if depth >= self._best_length:
+                    break
+                self._phase1(search, twist, flip, slice_, depth, -1, -1, [])
+        except (SearchBudgetExceeded, _SolutionFound):
+            pass
+
+        moves = None if self._best is None else [MOVES[action] for action in self._best]
+        return SolveResult(moves, search.nodes, time.perf_counter() - start)
+
+    def _phase1(self, search, twist, flip, slice_, depth, last, before_last, path):
+        search.visit()
+        distance = max(
+            self._twist_slice[twist * NUM_SLICES + slice_], self._flip_slice[flip * NUM_SLICES + slice_]
+        )
+        if distance > depth:
+            return
+        if depth == 0:
+            self._start_phase2(search, path)
+            return
+        for move in range(NUM_MOVES):
+            if not _allowed(move, last, before_last, INVERSE):
+                continue
+            path.append(move)
+            self._phase1(
+                search, self._twist_moves[twist][move], self._flip_moves[flip][move],
+                self._slice_moves[slice_][move], depth - 1, move, last, path,
+            )
+            path.pop()
+            if len(path) >= self._best_length:
+                return
+
+    def _start_phase2(self, search, phase1_path):
+        budget = self._best_length - len(phase1_path) - 1
+        if budget < 0:
+            return
+        corners, edges, slices = self._phase2_coordinates(apply_sequence(self._state, phase1_path))
+        for depth in range(budget + 1):
+            path: list[int] = []
+            if self._phase2(search, corners, edges, slices, depth, -1, -1, path):
+                actions = list(phase1_path)
+                for move in path:
+                    actions.extend(MOVE_INDEX[name] for name in PHASE2_MOVES[move])
+                if len(actions) < self._best_length:
+                    self._best = actions
+                    self._best_length = len(actions)
+                    if self._best_length <= self._target_length:
+                        raise _SolutionFound
+                return
+
+    def _phase2(self, search, corners, edges, slices, depth, last, before_last, path) -> bool:
+        search.visit()
+        distance = max(
+            self._corner_slice[corners * self._slice_permutations + slices],
+            self._edge_slice[edges * self._slice_permutations + slices],
+        )
+        if distance > depth:
+            return False
+        if depth == 0:
+            return True
+        for move in range(len(PHASE2_MOVES)):
+            if not _allowed(move, last, before_last, PHASE2_INVERSE):
+                continue
+            path.append(move)
+            if self._phase2(
+                search, self._corner_moves[corners][move], self._edge_moves[edges][move],
+                self._slice_permutation_moves[slices][move], depth - 1, move, last, path,
+            ):
+                return True
+            path.pop()
+        return False
+
+
+class IDAStarSolver:
+    def __init__(self, databases: list[PatternDatabase] | None = None):
+        self.databases = databases if databases is not None else default_databases()
+        for database in self.databases:
+            database.load()
+
+    def solve(self, state, max_depth: int = 20, time_limit: float | None = 10.0,
+              max_nodes: int | None = None) -> SolveResult:
+        state = as_state(state)
+        search = _Search(max_nodes, time_limit)
+        start = time.perf_counter()
+        indices = tuple(int(database.index(state[None])[0]) for database in self.databases)
+        self._goal = tuple(database.goal for database in self.databases)
+
+        moves = None
+        path: list[int] = []
+        try:
+            bound = self._heuristic(np.array([indices]).T)[0]
+            while bound <= max_depth:
+                next_bound = self._search(search, indices, 0, bound, -1, -1, path)
+                if next_bound is None:
+                    moves = [MOVES[action] for action in path]
+                    break
+                bound = next_bound
+        except SearchBudgetExceeded:
+            pass
+        return SolveResult(moves, search.nodes, time.perf_counter() - start)
+
+    def _heuristic(self, indices: np.ndarray) -> np.ndarray:
+        return np.max([database.lookup_indices(i) for database, i in zip(self.databases, indices)], axis=0)
+
+    def _search(self, search, indices, cost, bound, last, before_last, path):
+        search.visit()
+        if indices == self._goal:
+            return None
+        children = np.stack([
+            database.neighbors(np.array([index]))[0] for database, index in zip(self.databases, indices)
+        ])
+        estimates = (cost + 1 + self._heuristic(children)).tolist()
+        children = children.T.tolist()
+
+        smallest = None
+        for move in range(NUM_MOVES):
+            if not _allowed(move, last, before_last, INVERSE):
+                continue
+            if estimates[move] > bound:
+                smallest = estimates[move] if smallest is None else min(smallest, estimates[move])
+                continue
+            path.append(move)
+            result = self._search(search, tuple(children[move]), cost + 1, bound, move, last, path)
+            if result is None:
+                return None
+            path.pop()
+            smallest = result if smallest is None else min(smallest, result)
+        return smallest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solve scrambled cubes with the two-phase or IDA* solver")
+    parser.add_argument("--solver", choices=["two-phase", "ida"], default="two-phase")
+    parser.add_argument("--cubes", type=int, default=5)
+    parser.add_argument("--depth", type=int, default=25)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--time-limit", type=float, default=10.0)
+    args = parser.parse_args()
+
+    solver = TwoPhaseSolver() if args.solver == "two-phase" else IDAStarSolver()
+    states, _ = scramble_states(args.cubes, args.depth, args.seed)
+    for i, state in enumerate(states):
+        result = solver.solve(state, time_limit=args.time_limit)
+        if result.solved:
+            verified = (apply_sequence(state, result.moves) == SOLVED_STATE).all()
+            print(f"cube {i}: {len(result.moves)} moves, verified={verified}, "
+                  f"{result.nodes} nodes ({result.nodes_per_second:.0f} nodes/s)")
+            print(f"  {format_sequence(MOVE_INDEX[m] for m in result.moves)}")
+        else:
+            print(f"cube {i}: no solution within budget, {result.nodes} nodes")
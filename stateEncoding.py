@@ -0,0 +1,49 @@
+from operator import itemgetter
+
+import numpy as np
+
+from cubeLayout import CENTER_STICKERS, NUM_STICKERS, SOLVED_STATE
+
+# centers never move, so only the 48 remaining stickers are packed at 3 bits each
+PACKED_STICKERS = np.setdiff1d(np.arange(NUM_STICKERS), CENTER_STICKERS)
+BITS_PER_STICKER = 3
+KEY_SIZE = len(PACKED_STICKERS) * BITS_PER_STICKER // 8
+
+_SHIFTS = np.arange(BITS_PER_STICKER - 1, -1, -1, dtype=np.uint8)
+
+# a 3-bit sticker is one octal digit, so single states are packed by int(..., 8)
+_GATHER = itemgetter(*PACKED_STICKERS.tolist())
+_TO_DIGITS = bytes.maketrans(bytes(range(8)), b"01234567")
+_FROM_DIGITS = bytes.maketrans(b"01234567", bytes(range(8)))
+_DIGIT_FORMAT = f"0{len(PACKED_STICKERS)}o"
+
+
+def encode_state(state) -> bytes:
+    digits = bytes(_GATHER(state)).translate(_TO_DIGITS)
+    return int(digits, 8).to_bytes(KEY_SIZE, "big")
+
+
+def decode_state(key: bytes) -> list[int]:
+    digits = format(int.from_bytes(key, "big"), _DIGIT_FORMAT).encode().translate(_FROM_DIGITS)
+    state = SOLVED_STATE.tolist()
+    for i, value in zip(PACKED_STICKERS.tolist(), digits):
+        state[i] = value
+    return state
+
+
+def encode_batch(states: np.ndarray) -> np.ndarray:
+    states = np.asarray(states, dtype=np.uint8)[:, PACKED_STICKERS]
+    bits = (states[:, :, None] >> _SHIFTS) & 1
+    return np.packbits(bits.reshape(len(states), -1), axis=1)
+
+
+def decode_batch(packed: np.ndarray) -> np.ndarray:
+    bits = np.unpackbits(np.asarray(packed, dtype=np.uint8), axis=1)
+    bits = bits.reshape(len(packed), len(PACKED_STICKERS), BITS_PER_STICKER)
+    states = np.tile(SOLVED_STATE, (len(packed), 1))
+    states[:, PACKED_STICKERS] = (bits << _SHIFTS).sum(axis=2)
+    return states
+
+
+def batch_keys(packed: np.ndarray) -> list[bytes]:
+    return [row.tobytes() for row in packed]
@@ -0,0 +1,102 @@
+from itertools import permutations, product
+
+import numpy as np
+
+from cubeLayout import FACE_COLORS, FACE_NORMALS, MOVE_TABLES, NUM_STICKERS, STICKER_SLOTS, piece_position
+from cubePieces import color_onehotencoding
+from stateEncoding import PACKED_STICKERS, batch_keys, encode_batch
+
+
+def _symmetry_matrices() -> np.ndarray:
+    # every signed permutation matrix: 24 rotations and their 24 mirror images, identity first
+    matrices = []
+    for axes in permutations(range(3)):
+        for signs in product((1, -1), repeat=3):
+            matrix = np.zeros((3, 3), dtype=np.int64)
+            matrix[np.arange(3), axes] = signs
+            matrices.append(matrix)
+    return np.array(matrices)
+
+
+SYMMETRY_MATRICES = _symmetry_matrices()
+NUM_SYMMETRIES = len(SYMMETRY_MATRICES)
+
+
+def _build_symmetry_tables() -> tuple[np.ndarray, np.ndarray]:
+    lookup = {}
+    for i, (layer, index, face) in enumerate(STICKER_SLOTS):
+        lookup[(piece_position(layer, index), FACE_NORMALS[face])] = i
+    faces_by_normal = {normal: face for face, normal in FACE_NORMALS.items()}
+
+    stickers = np.empty((NUM_SYMMETRIES, NUM_STICKERS), dtype=np.intp)
+    colors = np.empty((NUM_SYMMETRIES, len(FACE_COLORS)), dtype=np.uint8)
+    for g, matrix in enumerate(SYMMETRY_MATRICES):
+        for j, (layer, index, face) in enumerate(STICKER_SLOTS):
+            source_position = tuple(matrix.T @ piece_position(layer, index))
+            source_normal = tuple(matrix.T @ FACE_NORMALS[face])
+            stickers[g, j] = lookup[(source_position, source_normal)]
+        for face, normal in FACE_NORMALS.items():
+            image = faces_by_normal[tuple(matrix @ normal)]
+            colors[g, color_onehotencoding[FACE_COLORS[face]]] = color_onehotencoding[FACE_COLORS[image]]
+    return stickers, colors
+
+
+# conjugate by g: new_state = SYMMETRY_COLORS[g][state[SYMMETRY_STICKERS[g]]]
+SYMMETRY_STICKERS, SYMMETRY_COLORS = _build_symmetry_tables()
+
+
+def apply_symmetry(states: np.ndarray, symmetries) -> np.ndarray:
+    states = np.asarray(states)
+    symmetries = np.asarray(symmetries)
+    shape = np.broadcast_shapes(states.shape[:-1], symmetries.shape)
+    states = np.broadcast_to(states, shape + states.shape[-1:])
+    symmetries = np.broadcast_to(symmetries, shape)
+    gathered = np.take_along_axis(states, SYMMETRY_STICKERS[symmetries], axis=-1)
+    return np.take_along_axis(SYMMETRY_COLORS[symmetries], gathered.astype(np.intp), axis=-1)
+
+
+def _build_move_conjugates() -> np.ndarray:
+    # a generic state is only fixed by the identity, so one probe pins every conjugate move down
+    probe = np.arange(NUM_STICKERS) % len(FACE_COLORS)
+    probe = probe[np.random.default_rng(0).permutation(NUM_STICKERS)]
+    conjugates = np.empty((NUM_SYMMETRIES, len(MOVE_TABLES)), dtype=np.int64)
+    for g in range(NUM_SYMMETRIES):
+        transformed = SYMMETRY_COLORS[g][probe[SYMMETRY_STICKERS[g]]]
+        for move, table in enumerate(MOVE_TABLES):
+            moved = SYMMETRY_COLORS[g][probe[table][SYMMETRY_STICKERS[g]]]
+            matches = [m for m, other in enumerate(MOVE_TABLES) if (transformed[other] == moved).all()]
+            if len(matches) != 1:
+                raise ValueError(f"symmetry {g} does not map move {move} onto a single move")
+            conjugates[g, move] = matches[0]
+    return conjugates
+
+
+# moving a state by m and then conjugating by g equals conjugating first and moving by MOVE_CONJUGATES[g, m]
+MOVE_CONJUGATES = _build_move_conjugates()
+MOVES_BACK = np.argsort(MOVE_CONJUGATES, axis=1)
+
+_WORD_STICKERS = np.array_split(PACKED_STICKERS, 3)
+
+
+def canonicalize(states: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    states = np.atleast_2d(np.asarray(states, dtype=np.uint8))
+    candidates = apply_symmetry(states[:, None, :], np.arange(NUM_SYMMETRIES))
+
+    # lexicographic minimum over the packed stickers, compared in three 48-bit words
+    best = np.ones(candidates.shape[:2], dtype=bool)
+    for stickers in _WORD_STICKERS:
+        weights = np.uint64(8) ** np.arange(len(stickers) - 1, -1, -1, dtype=np.uint64)
+        words = candidates[:, :, stickers].astype(np.uint64) @ weights
+        words = np.where(best, words, np.iinfo(np.uint64).max)
+        best &= words == words.min(axis=1, keepdims=True)
+    symmetries = np.argmax(best, axis=1)
+    return candidates[np.arange(len(states)), symmetries], symmetries
+
+
+def map_moves_back(symmetries, actions) -> np.ndarray:
+    return MOVES_BACK[np.asarray(symmetries), np.asarray(actions)]
+
+
+def canonical_keys(states: np.ndarray) -> list[bytes]:
+    canonical, _ = canonicalize(states)
+    return batch_keys(encode_batch(canonical))
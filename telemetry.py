@@ -0,0 +1,132 @@
+import cProfile
+import io
+import os
+import pstats
+import time
+from collections import defaultdict
+
+import numpy as np
+import tensorflow as tf
+
+
+class _Stage:
+    __slots__ = ("telemetry", "name", "start")
+
+    def __init__(self, telemetry, name: str):
+        self.telemetry = telemetry
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.telemetry.stage_seconds[self.name] += time.perf_counter() - self.start
+        return False
+
+
+class Telemetry:
+    # accumulates over a window of iterations and writes one set of TensorBoard scalars per window
+    def __init__(
+        self,
+        log_dir: str | None = None,
+        flush_every: int = 100,
+        profile_start: int | None = None,
+        profile_iterations: int = 20,
+        profiler: str = "tf",
+    ):
+        self.log_dir = log_dir
+        self.flush_every = flush_every
+        # profiling starts once an iteration has finished, so the earliest window begins at iteration 1
+        self.profile_start = None if profile_start is None else max(profile_start, 1)
+        self.profile_iterations = profile_iterations
+        self.profiler = profiler
+        self._writer = None
+        self._cprofile = None
+        self._profiling = False
+        if log_dir is not None:
+            self._writer = tf.summary.create_file_writer(log_dir)
+        self._reset_window()
+
+    def _reset_window(self):
+        self.stage_seconds = defaultdict(float)
+        self.counters = defaultdict(int)
+        self.values = defaultdict(list)
+        self.window_start = time.perf_counter()
+        self.window_iterations = 0
+
+    def stage(self, name: str) -> _Stage:
+        return _Stage(self, name)
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] += amount
+
+    def record(self, name: str, value):
+        if value is not None:
+            self.values[name].append(float(np.mean(value)))
+
+    def end_iteration(self, iteration: int) -> dict | None:
+        self.window_iterations += 1
+        self._profile(iteration)
+        if self.window_iterations < self.flush_every:
+            return None
+
+        elapsed = time.perf_counter() - self.window_start
+        summary = {
+            f"time/{name}_ms": seconds / self.window_iterations * 1e3
+            for name, seconds in self.stage_seconds.items()
+        }
+        summary["time/iteration_ms"] = elapsed / self.window_iterations * 1e3
+        summary.update({f"rate/{name}_per_sec": count / elapsed for name, count in self.counters.items()})
+        summary.update({name: float(np.mean(values)) for name, values in self.values.items()})
+        if self.counters["episodes"]:
+            summary["episode/solve_rate"] = self.counters["solved"] / self.counters["episodes"]
+
+        if self._writer is not None:
+            with self._writer.as_default(step=iteration):
+                for name, value in summary.items():
+                    tf.summary.scalar(name, value)
+            self._writer.flush()
+        self._reset_window()
+        return summary
+
+    def _profile(self, iteration: int):
+        # the profiled window is [profile_start, profile_start + profile_iterations); a resumed run may
+        # already be inside it, so start whenever the next iteration falls in the window
+        if self.profile_start is None:
+            return
+        upcoming = iteration + 1
+        in_window = self.profile_start <= upcoming < self.profile_start + self.profile_iterations
+        if in_window and not self._profiling:
+            self._start_profiler()
+        elif not in_window and self._profiling:
+            self._stop_profiler()
+
+    def _start_profiler(self):
+        if self.profiler == "tf":
+            tf.profiler.experimental.start(self.log_dir or "logs")
+        else:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        self._profiling = True
+
+    def _stop_profiler(self):
+        self._profiling = False
+        if self.profiler == "tf":
+            tf.profiler.experimental.stop()
+            return
+        self._cprofile.disable()
+        path = os.path.join(self.log_dir or ".", f"profile_{self.profile_start}.prof")
+        self._cprofile.dump_stats(path)
+        report = io.StringIO()
+        pstats.Stats(self._cprofile, stream=report).sort_stats("cumulative").print_stats(20)
+        print(report.getvalue())
+        print(f"wrote {path}")
+        self._cprofile = None
+
+    def close(self):
+        # a run that ends inside the window still gets its profile written
+        if self._profiling:
+            self._stop_profiler()
+        if self._writer is not None:
+            self._writer.close()
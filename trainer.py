@@ -0,0 +1,165 @@
+import argparse
+import os
+import threading
+import time
+
+import numpy as np
+
+from checkpointing import CHECKPOINT_DIR, Checkpointer
+from cubeEnv import CubeEnv
+from dqnAgent import DQNAgent
+from telemetry import Telemetry
+from Constants import NUM_CUBES, SAVE_ITERATION, RESET_ITERATION
+
+
+class Trainer:
+    def __init__(
+        self,
+        num_cubes: int = NUM_CUBES,
+        max_steps: int = 1000,
+        batch_size: int = 128,
+        train_steps_per_iteration: int = 10,
+        target_update_every: int = 10,
+        epsilon_start: float = 1.0,
+        epsilon_end: float = 0.05,
+        epsilon_decay: float = 0.999,
+        prioritized: bool = False,
+        jit_compile: bool = False,
+        mixed_precision: bool = False,
+        checkpoint_dir: str = CHECKPOINT_DIR,
+        keep_checkpoints: int = 3,
+        resume: bool = True,
+        telemetry: Telemetry | None = None,
+    ):
+        self.env = CubeEnv(num_cubes, max_steps)
+        self.agent = DQNAgent(
+            state_size=self.env.states.shape[1],
+            prioritized=prioritized,
+            jit_compile=jit_compile,
+            mixed_precision=mixed_precision,
+            replay_path=os.path.join(checkpoint_dir, "replay"),
+        )
+        self.checkpointer = Checkpointer(checkpoint_dir, keep_checkpoints)
+        self.telemetry = telemetry or Telemetry()
+        self.batch_size = batch_size
+        self.train_steps_per_iteration = train_steps_per_iteration
+        self.target_update_every = target_update_every
+        self.epsilon = epsilon_start
+        self.epsilon_end = epsilon_end
+        self.epsilon_decay = epsilon_decay
+        self.iteration = 0
+        self.stop_event = threading.Event()
+
+        state = self.checkpointer.restore(self.agent) if resume else None
+        if state is not None:
+            self.iteration = state["iteration"] + 1
+            self.epsilon = state["epsilon"]
+        else:
+            # the replay memmaps may still hold an earlier run's transitions and priorities
+            self.agent.replay_buffer.reset()
+
+    @property
+    def states(self) -> np.ndarray:
+        # env.states is replaced, never written in place, so observers on other threads can read it freely
+        return self.env.states
+
+    def step(self):
+        env, agent, telemetry = self.env, self.agent, self.telemetry
+
+        states = env.states
+        with telemetry.stage("act"):
+            actions = agent.act_batch(states, self.epsilon)
+        with telemetry.stage("env_step"):
+            next_states, rewards, dones = env.step(actions)
+
+        with telemetry.stage("remember"):
+            agent.remember_batch(states, actions, rewards, next_states, dones)
+
+        solved = int(env.solved.sum())
+        for _ in range(solved):
+            print("=" * 25 + "Cube solved!" + "=" * 25)
+        for i in np.flatnonzero(dones):
+            print(f"[cube {i}] episode reward={env.episode_rewards[i]:.2f} epsilon={self.epsilon:.3f}")
+            telemetry.record("episode/reward", env.episode_rewards[i])
+        telemetry.count("env_steps", env.num_cubes)
+        telemetry.count("episodes", int(dones.sum()))
+        telemetry.count("solved", solved)
+        env.reset(dones)
+
+        self.epsilon = max(self.epsilon_end, self.epsilon * self.epsilon_decay)
+
+        with telemetry.stage("replay"):
+            losses = agent.replay_many(self.train_steps_per_iteration, self.batch_size)
+        if losses is not None:
+            telemetry.count("gradient_steps", self.train_steps_per_iteration)
+            telemetry.record("train/loss", losses.numpy())
+
+        if self.iteration % self.target_update_every == 0:
+            with telemetry.stage("update_target"):
+                agent.update_target()
+
+        if self.iteration % SAVE_ITERATION == 0:
+            with telemetry.stage("checkpoint"):
+                self.checkpointer.save(agent, self.iteration, {"epsilon": self.epsilon})
+            print(f"Iteration {self.iteration} complete (epsilon={self.epsilon:.3f})")
+
+        if self.iteration % RESET_ITERATION == 0:
+            agent.reset_gamma()
+
+        telemetry.record("replay/occupancy", len(agent.replay_buffer) / agent.replay_buffer.capacity)
+        telemetry.record("train/epsilon", self.epsilon)
+        telemetry.end_iteration(self.iteration)
+        self.iteration += 1
+
+    def run(self, num_iterations: int = 100_000):
+        start = time.perf_counter()
+        first = self.iteration
+        try:
+            while self.iteration < num_iterations and not self.stop_event.is_set():
+                self.step()
+        finally:
+            self.checkpointer.wait()
+            self.telemetry.close()
+        elapsed = time.perf_counter() - start
+        print(f"{self.iteration - first} iterations in {elapsed:.1f}s")
+
+    def stop(self):
+        self.stop_event.set()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the DQN agent without a window")
+    parser.add_argument("--iterations", type=int, default=100_000)
+    parser.add_argument("--cubes", type=int, default=NUM_CUBES)
+    parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--max-steps", type=int, default=1000)
+    parser.add_argument("--train-steps", type=int, default=10)
+    parser.add_argument("--prioritized", action="store_true")
+    parser.add_argument("--xla", action="store_true")
+    parser.add_argument("--mixed-precision", action="store_true")
+    parser.add_argument("--checkpoint-dir", default=CHECKPOINT_DIR)
+    parser.add_argument("--keep-checkpoints", type=int, default=3)
+    parser.add_argument("--fresh", action="store_true", help="ignore existing checkpoints")
+    parser.add_argument("--log-dir", default=None, help="write TensorBoard summaries here")
+    parser.add_argument("--log-every", type=int, default=100)
+    parser.add_argument("--profile-start", type=int, default=None)
+    parser.add_argument("--profile-iterations", type=int, default=20)
+    parser.add_argument("--profiler", choices=["tf", "cprofile"], default="tf")
+    args = parser.parse_args()
+
+    trainer = Trainer(
+        num_cubes=args.cubes,
+        max_steps=args.max_steps,
+        batch_size=args.batch_size,
+        train_steps_per_iteration=args.train_steps,
+        prioritized=args.prioritized,
+        jit_compile=args.xla,
+        mixed_precision=args.mixed_precision,
+        checkpoint_dir=args.checkpoint_dir,
+        keep_checkpoints=args.keep_checkpoints,
+        resume=not args.fresh,
+        telemetry=Telemetry(
+            args.log_dir, args.log_every, args.profile_start, args.profile_iterations, args.profiler
+        ),
+    )
+    trainer.run(args.iterations)